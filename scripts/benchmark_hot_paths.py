@@ -0,0 +1,181 @@
+"""
+Time and memory benchmarks of report hot paths on synthetic data (see `synthetic_data.py`).
+
+Every case runs at each scale (number of reviews and staff reports): `repeats` timed runs, the median is reported,
+plus one run under tracemalloc for the peak of Python allocations.
+
+Usage:
+    SETTINGS_PATH=settings.yaml poetry run python ./scripts/benchmark_hot_paths.py
+        [--scales 10,1000,100000] [--repeats 3] [--cases happiness_chart,format_review]
+        [--save baseline.json] [--compare baseline.json] [--threshold 0.25]
+
+`--save` writes results as a JSON baseline. `--compare` prints the change against a baseline and exits with
+code 1 if a case got slower or takes more memory by more than `--threshold` (a share, 0.25 is +25%).
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+# keep the real database untouched
+os.environ.setdefault("DATABASE_PATH", str(Path(tempfile.mkdtemp()) / "sqlite.db"))
+
+from synthetic_data import staff_report_rows, staff_reports, toweco_reviews  # noqa: E402
+
+from src.bot.daily_report import get_today, report_text  # noqa: E402
+from src.bot.pdf_report import create_mood_meter, generate_summary_pdf  # noqa: E402
+from src.bot.plotting import happiness_chart, provider_pie_chart, rating_distribution_chart  # noqa: E402
+from src.bot.toweco_repository import toweco_repository  # noqa: E402
+from src.bot.waiter_repository import waiter_repository  # noqa: E402
+
+# Memory is not compared below this peak: small allocations depend on caches more than on the code
+MEMORY_NOISE_BYTES = 64 * 1024
+# Time is not compared below this median for the same reason
+TIME_NOISE_SECONDS = 0.001
+
+AI_SUMMARY = "Гости жалуются на время ожидания.\nПерсонал хвалят за вежливость.\nСтоит добавить безлактозное молоко."
+
+
+class Data:
+    def __init__(self, scale: int):
+        self.reviews = toweco_reviews(scale)
+        self.report_rows = staff_report_rows(scale)
+        self.reports = staff_reports(scale)
+        self.today = get_today()
+        self.date_from = self.today - datetime.timedelta(days=13)
+        self.mean_rating = statistics.mean(review["rating"] for review in self.reviews)
+        self.aggregates = self._aggregates()
+
+    def _aggregates(self) -> dict:
+        histogram = {rating: 0 for rating in range(1, 6)}
+        providers = Counter()
+        days: dict[datetime.date, list[int]] = {}
+        for review in self.reviews:
+            histogram[review["rating"]] += 1
+            providers[review["provider"]] += 1
+            day = days.setdefault(datetime.datetime.fromisoformat(review["publishedAt"]).date(), [0, 0])
+            day[0] += 1
+            day[1] += review["rating"]
+        return {
+            "histogram": histogram,
+            "providers": providers.most_common(),
+            "review_days": sorted((day, count, rating_sum) for day, (count, rating_sum) in days.items()),
+        }
+
+
+CASES: dict[str, Callable[[Data], object]] = {
+    "happiness_chart": lambda data: happiness_chart(data.reviews),
+    "provider_pie_chart": lambda data: provider_pie_chart(data.reviews),
+    "rating_distribution_chart": lambda data: rating_distribution_chart(data.reviews),
+    "generate_summary_pdf": lambda data: generate_summary_pdf(
+        data.reviews, data.reports, AI_SUMMARY, aggregates=data.aggregates
+    ),
+    "create_mood_meter": lambda data: create_mood_meter(data.mean_rating),
+    "format_review": lambda data: [toweco_repository.format_review(review) for review in data.reviews],
+    "to_toweco_format": lambda data: [waiter_repository.to_toweco_format(row) for row in data.report_rows],
+    "report_text": lambda data: report_text(data.reviews, data.reports, data.date_from, data.today),
+}
+
+
+def measure(case: Callable[[Data], object], data: Data, repeats: int) -> dict:
+    case(data)  # warm up: imports, font caches, lru caches
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        case(data)
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        case(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_s": statistics.median(durations), "min_s": min(durations), "peak_bytes": peak}
+
+
+def run(scales: list[int], cases: list[str], repeats: int) -> dict[str, dict]:
+    results = {}
+    for scale in scales:
+        data = Data(scale)
+        for name in cases:
+            key = f"{name}@{scale}"
+            results[key] = measure(CASES[name], data, repeats)
+            print(
+                f"{key:>36}: {results[key]['median_s'] * 1000:9.1f} ms"
+                f"  {results[key]['peak_bytes'] / 1024 / 1024:8.2f} MiB",
+                flush=True,
+            )
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Print the change of every case against the baseline, return regressed cases"""
+    regressions = []
+    print("\n| Case | Time, ms | Δ time | Peak, MiB | Δ memory |\n|---|---:|---:|---:|---:|")
+    for key, result in results.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"| {key} | {result['median_s'] * 1000:.1f} | new | {result['peak_bytes'] / 2**20:.2f} | new |")
+            continue
+        time_change = result["median_s"] / before["median_s"] - 1 if before["median_s"] else 0
+        memory_change = result["peak_bytes"] / before["peak_bytes"] - 1 if before["peak_bytes"] else 0
+        slower = time_change > threshold and result["median_s"] > TIME_NOISE_SECONDS
+        bigger = memory_change > threshold and result["peak_bytes"] > MEMORY_NOISE_BYTES
+        mark = " ❌" if slower or bigger else ""
+        print(
+            f"| {key}{mark} | {result['median_s'] * 1000:.1f} | {time_change:+.0%}"
+            f" | {result['peak_bytes'] / 2**20:.2f} | {memory_change:+.0%} |"
+        )
+        if slower or bigger:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default="10,1000,100000", help="comma-separated numbers of reviews and reports")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated case names")
+    parser.add_argument("--save", type=Path, help="write results to this JSON baseline")
+    parser.add_argument("--compare", type=Path, help="compare results with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown or memory growth share")
+    args = parser.parse_args()
+
+    cases = args.cases.split(",")
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)} (available: {', '.join(CASES)})")
+    results = run([int(scale) for scale in args.scales.split(",")], cases, args.repeats)
+
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {"python": platform.python_version(), "machine": platform.machine(), "results": results}, indent=2
+            )
+        )
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ Regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
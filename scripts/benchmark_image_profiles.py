@@ -0,0 +1,70 @@
+"""
+Encode time and size of report charts and the mood meter for several image profiles.
+
+Usage: poetry run python ./scripts/benchmark_image_profiles.py [repeats]
+"""
+
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.bot.pdf_report import create_mood_meter  # noqa: E402
+from src.bot.plotting import happiness_chart, provider_pie_chart, rating_distribution_chart  # noqa: E402
+from src.config_schema import ImageFormat, ImageProfile  # noqa: E402
+
+PROFILES = {
+    "png 200dpi (default)": ImageProfile(),
+    "png 100dpi": ImageProfile(dpi=100),
+    "png-palette 200dpi": ImageProfile(format=ImageFormat.PNG_PALETTE),
+    "png-palette 100dpi": ImageProfile(format=ImageFormat.PNG_PALETTE, dpi=100),
+    "webp 150dpi q80": ImageProfile(format=ImageFormat.WEBP, dpi=150, quality=80),
+    "webp 100dpi q70": ImageProfile(format=ImageFormat.WEBP, dpi=100, quality=70),
+    "jpeg 150dpi q85": ImageProfile(format=ImageFormat.JPEG, dpi=150, quality=85),
+    "jpeg 100dpi q75": ImageProfile(format=ImageFormat.JPEG, dpi=100, quality=75),
+}
+
+
+def synthetic_reviews(count: int = 300) -> list[dict]:
+    now = datetime.datetime.now(datetime.UTC)
+    return [
+        {
+            "publishedAt": (now - datetime.timedelta(days=random.random() * 14)).isoformat(),
+            "rating": random.choice([1, 2, 3, 4, 4, 5, 5, 5]),
+            "provider": random.choice(["2ГИС", "Яндекс", "Google", "Товеко QR-код"]),
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    random.seed(108)
+    reviews = synthetic_reviews()
+    charts = {
+        "charts album": lambda profile: [
+            happiness_chart(reviews, profile),
+            provider_pie_chart(reviews, profile),
+            rating_distribution_chart(reviews, profile),
+        ],
+        "mood meter": lambda profile: [create_mood_meter(4.3, profile)],
+    }
+
+    print("| Profile | Image | Encode, ms | Size, KiB |")
+    print("|---|---|---:|---:|")
+    for name, profile in PROFILES.items():
+        for image, render in charts.items():
+            render(profile)  # warm up
+            started = time.perf_counter()
+            for _ in range(repeats):
+                images = render(profile)
+            elapsed = (time.perf_counter() - started) / repeats
+            size = sum(len(image_bytes) for image_bytes in images)
+            print(f"| {name} | {image} | {elapsed * 1000:.0f} | {size / 1024:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
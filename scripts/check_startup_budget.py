@@ -0,0 +1,82 @@
+"""
+Time-to-first-update check: imports the bot, runs startup against a fake Telegram API and measures the time
+until the first update is handled.
+
+aiogram's own import (pydantic models of the whole Bot API) is measured separately and is not counted
+against the budget, so the check is about the bot's code and does not depend on how fast the machine is.
+Exits with code 1 if the bot's share takes longer than the budget or if one of heavy subsystems
+(`HEAVY_MODULES`) was loaded before the first update.
+
+Usage: SETTINGS_PATH=settings.yaml poetry run python ./scripts/check_startup_budget.py [budget seconds, default 1.5]
+"""
+
+import time
+
+START = time.perf_counter()
+
+import aiogram  # noqa: E402, F401
+
+AIOGRAM_IMPORTED = time.perf_counter()
+
+import asyncio  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+os.chdir(Path(__file__).parents[1])
+# keep the real database untouched
+os.environ.setdefault("DATABASE_PATH", str(Path(tempfile.mkdtemp()) / "sqlite.db"))
+
+from fake_telegram import FakeTelegramSession, message_update  # noqa: E402
+
+HEAVY_MODULES = ["pandas", "matplotlib", "openai", "reportlab", "src.bot.plotting", "src.bot.pdf_report"]
+
+
+async def run() -> dict[str, float]:
+    from src.bot.app import bot, dp, main
+
+    imported = time.perf_counter()
+    session = FakeTelegramSession()
+    bot.session = session
+
+    timings = {"aiogram import": AIOGRAM_IMPORTED - START, "import": imported - START}
+
+    @dp.update.outer_middleware()
+    async def first_update(handler, event, data):
+        result = await handler(event, data)
+        if "first update" not in timings:
+            timings["first update"] = time.perf_counter() - START
+            asyncio.create_task(dp.stop_polling())
+        return result
+
+    @dp.startup()
+    async def started():
+        timings["startup"] = time.perf_counter() - START
+
+    session.feed(message_update("/start"))
+    await asyncio.wait_for(main(), timeout=60)
+    return timings
+
+
+def report():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.5
+    timings = asyncio.run(run())
+    for stage, seconds in timings.items():
+        print(f"{stage:>14}: {seconds:.2f} s")
+    own = timings.get("first update", float("inf")) - timings["aiogram import"]
+    print(f"{'bot share':>14}: {own:.2f} s")
+
+    loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+    if loaded:
+        print(f"❌ Loaded before the first update was handled: {', '.join(loaded)}")
+        sys.exit(1)
+    if own > budget:
+        print(f"❌ Time to first update is over the budget of {budget:.2f} s")
+        sys.exit(1)
+    print(f"✅ Time to first update is within the budget of {budget:.2f} s")
+
+
+report()
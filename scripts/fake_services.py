@@ -0,0 +1,239 @@
+"""
+Local stand-ins for the Toweco JSON-RPC API and the OpenAI API, to measure timeouts, retries and throughput offline.
+
+Served on one port:
+- Toweco at `/toweco/`: `api/v1/auth/getToken` and JSON-RPC batches with `private.getReviews` (paging with `page`,
+  filtering with `dateFrom`/`dateTo`) and `private.getLocations`;
+- OpenAI at `/openai/v1/`: `chat/completions` and `audio/transcriptions`.
+
+Every request waits `latency` ± `jitter` seconds and may fail with 429 (`rate_429`) or 401 (`rate_401`, for Toweco
+the access token is revoked so the bot has to log in again). Reviews are synthetic (see `synthetic_data.py`)
+unless a fixture file is given: JSON with recorded responses, any key may be omitted:
+
+    {"reviews": [<private.getReviews reviews>], "locations": [...], "chat": "<answer>", "transcription": "<text>"}
+
+Point the bot at the fakes in `settings.yaml`:
+
+    toweco_base_url: http://127.0.0.1:8081/toweco/
+    openai_base_url: http://127.0.0.1:8081/openai/v1
+    openai_proxy_url: ""
+
+Usage:
+    poetry run python ./scripts/fake_services.py [--port 8081] [--latency 0.2] [--jitter 0.1]
+        [--rate-429 0.05] [--rate-401 0.01] [--reviews 300] [--page-size 100] [--fixtures fixtures.json]
+
+Request counts by endpoint and status are served at `/stats`.
+"""
+
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import random
+import secrets
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from aiohttp import web
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+
+DEFAULT_CHAT_ANSWER = (
+    "📍 ПРОБЛЕМЫ (отрицательные отзывы):\n**Сервис:**\nдолгое ожидание заказа\n"
+    "──────────────────────────────\n📍 ПОЛОЖИТЕЛЬНОЕ:\n**Продукт:**\nдесерты и завтраки"
+)
+DEFAULT_TRANSCRIPTION = "Гости просили сделать музыку потише"
+DEFAULT_LOCATIONS = [{"id": 1, "name": "Fika", "address": "Казахстан, г Алматы, ул Кабанбай Батыра, д 104"}]
+
+
+@dataclass
+class Options:
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_429: float = 0.0
+    rate_401: float = 0.0
+    reviews: int = 300
+    page_size: int = 100
+    fixtures: dict = field(default_factory=dict)
+    seed: int = 108
+
+
+class FakeServices:
+    def __init__(self, options: Options):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.stats: Counter[str] = Counter()
+        self.tokens: set[str] = set()
+        self._completion_ids = itertools.count(1)
+        if "reviews" in options.fixtures:
+            self.reviews = options.fixtures["reviews"]
+        else:
+            from synthetic_data import toweco_reviews
+
+            self.reviews = toweco_reviews(options.reviews, days=30, seed=options.seed)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_post("/toweco/api/v1/auth/getToken", self.toweco_auth)
+        app.router.add_post("/toweco/", self.toweco_rpc)
+        app.router.add_post("/openai/v1/chat/completions", self.openai_chat)
+        app.router.add_post("/openai/v1/audio/transcriptions", self.openai_transcription)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+    @web.middleware
+    async def faults(self, request: web.Request, handler) -> web.StreamResponse:
+        """Latency and injected errors for every endpoint except `/stats`"""
+        if request.path == "/stats":
+            return await handler(request)
+        options = self.options
+        if options.latency or options.jitter:
+            await asyncio.sleep(max(options.latency + self.rng.uniform(-options.jitter, options.jitter), 0))
+        service = "toweco" if request.path.startswith("/toweco/") else "openai"
+        roll = self.rng.random()
+        if roll < options.rate_429:
+            response = self._error(service, 429, "Too many requests")
+            response.headers["Retry-After"] = "1"
+        elif roll < options.rate_429 + options.rate_401 and not request.path.endswith("getToken"):
+            self.tokens.clear()  # the token expired: Toweco requests fail until the next login
+            response = self._error(service, 401, "unauthorized")
+        else:
+            response = await handler(request)
+        self.stats[f"{request.path} {response.status}"] += 1
+        return response
+
+    def _error(self, service: str, status: int, message: str) -> web.Response:
+        if service == "toweco":
+            body = [{"id": 0, "jsonrpc": "2.0", "error": {"code": status, "message": message}}]
+        else:
+            body = {"error": {"message": message, "type": "fake_error", "code": str(status)}}
+        return web.json_response(body, status=status)
+
+    async def toweco_auth(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if not payload.get("params", {}).get("username"):
+            return self._error("toweco", 401, "unauthorized")
+        token = secrets.token_hex(16)
+        self.tokens.add(token)
+        return web.json_response({"id": payload.get("id"), "jsonrpc": "2.0", "result": {"accessToken": token}})
+
+    async def toweco_rpc(self, request: web.Request) -> web.Response:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if token not in self.tokens:
+            return self._error("toweco", 401, "unauthorized")
+        payload = await request.json()
+        calls = payload if isinstance(payload, list) else [payload]
+        return web.json_response([self._toweco_call(call) for call in calls])
+
+    def _toweco_call(self, call: dict) -> dict:
+        params = call.get("params") or {}
+        match call.get("method"):
+            case "private.getReviews":
+                result = {"reviews": self._reviews_page(params)}
+            case "private.getLocations":
+                result = {"locations": self.options.fixtures.get("locations", DEFAULT_LOCATIONS)}
+            case method:
+                return {"id": call.get("id"), "jsonrpc": "2.0", "error": {"code": -32601, "message": f"{method}?"}}
+        return {"id": call.get("id"), "jsonrpc": "2.0", "result": result}
+
+    def _reviews_page(self, params: dict) -> dict:
+        reviews = self.reviews
+        if "dateFrom" in params or "dateTo" in params:
+            date_from = _parse_date(params.get("dateFrom"), datetime.date.min)
+            date_to = _parse_date(params.get("dateTo"), datetime.date.max)
+            reviews = [
+                review
+                for review in reviews
+                if date_from <= datetime.datetime.fromisoformat(review["publishedAt"]).date() <= date_to
+            ]
+        total = len(reviews)
+        if "page" in params:
+            page = int(params["page"])
+            size = self.options.page_size
+            reviews = reviews[(page - 1) * size : page * size]
+            return {"reviews": reviews, "page": page, "pages": -(-total // size), "total": total}
+        return {"reviews": reviews, "total": total}
+
+    async def openai_chat(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        content = self.options.fixtures.get("chat", DEFAULT_CHAT_ANSWER)
+        prompt_tokens = sum(len(message.get("content", "")) for message in payload.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        return web.json_response(
+            {
+                "id": f"chatcmpl-fake{next(self._completion_ids)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "gpt-4o"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def openai_transcription(self, request: web.Request) -> web.Response:
+        form = await request.post()  # read the uploaded audio like the real API does
+        text = self.options.fixtures.get("transcription", DEFAULT_TRANSCRIPTION)
+        if form.get("response_format", "json") == "text":
+            return web.Response(text=text + "\n")
+        return web.json_response({"text": text})
+
+    async def get_stats(self, _: web.Request) -> web.Response:
+        return web.json_response(dict(sorted(self.stats.items())))
+
+
+def _parse_date(value: str | None, default: datetime.date) -> datetime.date:
+    return datetime.datetime.strptime(value, "%d.%m.%Y").date() if value else default
+
+
+async def start_fake_services(host: str, port: int, options: Options) -> tuple[web.AppRunner, FakeServices]:
+    """Serve the fakes in the running event loop, e.g. next to the bot in a load check"""
+    services = FakeServices(options)
+    runner = web.AppRunner(services.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner, services
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random ± seconds added to the latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--rate-401", type=float, default=0.0, help="share of requests answered with 401")
+    parser.add_argument("--reviews", type=int, default=300, help="number of synthetic reviews over 30 days")
+    parser.add_argument("--page-size", type=int, default=100, help="reviews per page of private.getReviews")
+    parser.add_argument("--fixtures", type=Path, help="JSON file with recorded responses")
+    args = parser.parse_args()
+
+    options = Options(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        rate_401=args.rate_401,
+        reviews=args.reviews,
+        page_size=args.page_size,
+        fixtures=json.loads(args.fixtures.read_text()) if args.fixtures else {},
+    )
+    services = FakeServices(options)
+    print(f"Toweco: http://{args.host}:{args.port}/toweco/  OpenAI: http://{args.host}:{args.port}/openai/v1")
+    try:
+        web.run_app(services.app(), host=args.host, port=args.port, access_log=None, print=None)
+    finally:
+        print(json.dumps(dict(sorted(services.stats.items())), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+In-process fake of the Telegram Bot API for startup and load checks.
+
+`FakeTelegramSession` replaces `bot.session`: outgoing requests are recorded and answered with plausible
+results (parsed by aiogram exactly like real responses), `getUpdates` serves updates queued with `feed`.
+The last message sent to every chat is kept with its inline keyboard in `last_messages`, so that dialogs
+can be driven with `callback_update`.
+"""
+
+import asyncio
+import datetime
+import itertools
+import json
+import typing
+from collections import Counter
+from collections.abc import AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import InlineKeyboardMarkup, Message
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "Fika", "username": "fika_bot"}
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int, first_name: str) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": first_name}
+
+
+def message_update(text: str, user_id: int = 1000, first_name: str = "Guest") -> dict:
+    """Raw update with a private text message from `user_id`"""
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(datetime.datetime.now(datetime.UTC).timestamp()),
+            "chat": {"id": user_id, "type": "private", "first_name": first_name},
+            "from": _user(user_id, first_name),
+            "text": text,
+            **(
+                {"entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]}
+                if text[:1] == "/"
+                else {}
+            ),
+        },
+    }
+
+
+def voice_update(user_id: int = 1000, first_name: str = "Guest", duration: int = 5) -> dict:
+    """Raw update with a private voice message from `user_id`"""
+    message_id = next(_message_ids)
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": message_id,
+            "date": int(datetime.datetime.now(datetime.UTC).timestamp()),
+            "chat": {"id": user_id, "type": "private", "first_name": first_name},
+            "from": _user(user_id, first_name),
+            "voice": {"file_id": f"voice{message_id}", "file_unique_id": f"voice{message_id}", "duration": duration},
+        },
+    }
+
+
+def callback_update(data: str, message: dict, user_id: int = 1000, first_name: str = "Guest") -> dict:
+    """Raw update with a press of an inline button with `data` under a bot `message`"""
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "chat_instance": str(user_id),
+            "from": _user(user_id, first_name),
+            "message": message,
+            "data": data,
+        },
+    }
+
+
+def find_button(message: dict, suffix: str) -> str | None:
+    """Callback data of the first inline button under `message` which ends with `suffix` (widget id)"""
+    for row in message.get("reply_markup", {}).get("inline_keyboard", []):
+        for button in row:
+            if button.get("callback_data", "").endswith(suffix):
+                return button["callback_data"]
+    return None
+
+
+class FakeTelegramSession(BaseSession):
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests: Counter[str] = Counter()
+        self.updates: asyncio.Queue[dict] = asyncio.Queue()
+        self.last_messages: dict[int | str, dict] = {}
+
+    def feed(self, *updates: dict) -> None:
+        for update in updates:
+            self.updates.put_nowait(update)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: int | None = None
+    ) -> TelegramType:
+        api_method = method.__api_method__
+        self.requests[api_method] += 1
+        if api_method == "getUpdates":
+            result = await self._get_updates(method.timeout or 0)
+        else:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            result = self._result(api_method, method)
+        response = self.check_response(bot, method, 200, json.dumps({"ok": True, "result": result}))
+        return response.result
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def _get_updates(self, timeout: float) -> list[dict]:
+        try:
+            first = await asyncio.wait_for(self.updates.get(), timeout=max(timeout, 0.01))
+        except TimeoutError:
+            return []
+        batch = [first]
+        while not self.updates.empty() and len(batch) < 100:
+            batch.append(self.updates.get_nowait())
+        return batch
+
+    def _result(self, api_method: str, method: TelegramMethod):
+        match api_method:
+            case "getMe":
+                return BOT_USER
+            case "getMyName":
+                return {"name": BOT_USER["first_name"]}
+            case "getMyDescription":
+                return {"description": ""}
+            case "getMyShortDescription":
+                return {"short_description": ""}
+            case "getMyCommands":
+                return []
+            case "copyMessage":
+                return {"message_id": next(_message_ids)}
+            case "getFile":
+                return {"file_id": method.file_id, "file_unique_id": method.file_id, "file_path": "voice/file.oga"}
+        if method.__returning__ == list[Message]:
+            return [self._message(method)]
+        if method.__returning__ is Message or Message in typing.get_args(method.__returning__):
+            return self._message(method)
+        return True
+
+    def _message(self, method: TelegramMethod) -> dict:
+        chat_id = getattr(method, "chat_id", None) or 0
+        message_id = getattr(method, "message_id", None)
+        if message_id is None or method.__api_method__ == "forwardMessage":
+            message_id = next(_message_ids)
+        message = {
+            "message_id": message_id,
+            "date": int(datetime.datetime.now(datetime.UTC).timestamp()),
+            "chat": {"id": chat_id, "type": "private" if isinstance(chat_id, int) and chat_id > 0 else "channel"},
+            "from": BOT_USER,
+            "text": getattr(method, "text", None) or "",
+        }
+        reply_markup = getattr(method, "reply_markup", None)
+        if isinstance(reply_markup, InlineKeyboardMarkup):
+            message["reply_markup"] = reply_markup.model_dump(mode="json", exclude_none=True)
+        self.last_messages[chat_id] = message
+        return message
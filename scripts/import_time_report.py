@@ -0,0 +1,60 @@
+"""
+Per-module import cost of the bot (`python -X importtime`), grouped by top-level package.
+
+Usage: SETTINGS_PATH=settings.yaml poetry run python ./scripts/import_time_report.py [module] [top N]
+
+`module` defaults to `src.bot.app`, `top N` to 25.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> list[tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) in the order printed by `-X importtime`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parents[1],
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parents[1])},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        sys.exit(result.stderr[-2000:])
+    return [
+        (name, int(self_us), int(cumulative_us), len(indent) // 2)
+        for self_us, cumulative_us, indent, name in LINE.findall(result.stderr)
+    ]
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "src.bot.app"
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    times = import_times(module)
+    total = sum(self_us for _, self_us, _, _ in times)
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in times:
+        package = ".".join(name.split(".")[:3]) if name.startswith("src.") else name.split(".")[0]
+        by_package[package] += self_us
+
+    print(f"Importing `{module}`: {total / 1e6:.2f} s, {len(times)} modules\n")
+    print("| Package | Self time, ms | Share |")
+    print("|---|---:|---:|")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"| {package} | {self_us / 1e3:.0f} | {self_us / total:.0%} |")
+
+    print("\n| Module (cumulative) | Time, ms |")
+    print("|---|---:|")
+    for name, _, cumulative_us, depth in sorted(times, key=lambda item: -item[2])[:top]:
+        print(f"| {'  ' * depth}{name} | {cumulative_us / 1e3:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Offline load check of the dispatcher: synthetic updates are fed into `dp.feed_raw_update` against a fake Telegram
+API ([fake_telegram.py](fake_telegram.py)) at increasing concurrency.
+
+Every virtual staff member sends `/start <secret_for_waiter>`, then `rounds` times opens the feedback window with
+the dialog button and sends text or voice feedback. Every round a stranger writes to the bot and presses a button
+of a dialog which does not exist anymore (unknown events). Updates of one chat are fed one by one, chats in parallel.
+
+Reports throughput, p50/p99 latency of `feed_raw_update` and SQL statements per update (`sqlite3` trace callback).
+Transcription is replaced with a sleep of `--openai-latency`, so no external service is called.
+
+Usage:
+    SETTINGS_PATH=settings.yaml poetry run python ./scripts/replay_load.py
+        [--concurrency 1,8,32,128] [--rounds 3] [--latency 0.05] [--openai-latency 0.5] [--log-level ERROR]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+os.chdir(Path(__file__).parents[1])
+# keep the real database untouched
+os.environ.setdefault("DATABASE_PATH", str(Path(tempfile.mkdtemp()) / "sqlite.db"))
+
+from fake_telegram import FakeTelegramSession, callback_update, find_button, message_update, voice_update  # noqa: E402
+from synthetic_data import PHRASES  # noqa: E402
+
+
+class Load:
+    def __init__(self, bot, dp, session: FakeTelegramSession):
+        self.bot = bot
+        self.dp = dp
+        self.session = session
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    async def feed(self, raw: dict) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_raw_update(self.bot, raw)
+        except Exception:
+            self.errors += 1
+        self.latencies.append(time.perf_counter() - started)
+
+    async def staff(self, user_id: int, rounds: int, secret: str) -> None:
+        rng = random.Random(user_id)
+        await self.feed(message_update(f"/start {secret}", user_id, "Staff"))
+        for _ in range(rounds):
+            menu = self.session.last_messages.get(user_id, {})
+            data = find_button(menu, "new_feedback")
+            if data is None:  # the dialog was not shown, count as a failure and go on
+                self.errors += 1
+            else:
+                await self.feed(callback_update(data, menu, user_id, "Staff"))
+            if rng.random() < 0.8:
+                await self.feed(message_update(rng.choice(PHRASES), user_id, "Staff"))
+            else:
+                await self.feed(voice_update(user_id, "Staff"))
+
+    async def stranger(self, user_id: int, rounds: int) -> None:
+        stale = {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "text": "Меню сотрудника",
+        }
+        for _ in range(rounds):
+            await self.feed(message_update("Здравствуйте, где меню?", user_id))
+            await self.feed(callback_update("0000000\x1dnew_feedback", stale, user_id))
+
+
+async def run_level(bot, dp, session, concurrency: int, rounds: int, secret: str, first_user_id: int) -> dict:
+    from src.bot.db import conn
+
+    load = Load(bot, dp, session)
+    statements = 0
+
+    def count_statement(_: str) -> None:
+        nonlocal statements
+        statements += 1
+
+    staff_ids = range(first_user_id, first_user_id + concurrency)
+    stranger_ids = range(first_user_id + concurrency, first_user_id + concurrency + max(concurrency // 4, 1))
+    requests_before = sum(session.requests.values())
+    conn.set_trace_callback(count_statement)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(load.staff(user_id, rounds, secret) for user_id in staff_ids),
+            *(load.stranger(user_id, rounds) for user_id in stranger_ids),
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        conn.set_trace_callback(None)
+
+    updates = len(load.latencies)
+    latencies = sorted(load.latencies)
+    return {
+        "concurrency": concurrency,
+        "updates": updates,
+        "errors": load.errors,
+        "throughput": updates / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+        "sql": statements / updates,
+        "api": (sum(session.requests.values()) - requests_before) / updates,
+    }
+
+
+async def run(args) -> list[dict]:
+    from src.bot.app import bot, dp
+    from src.bot.openai_repository import openai_repository
+    from src.config import settings
+
+    # after the app import: logging_ configures the loggers on import and would reset the levels
+    logging.getLogger("src").setLevel(args.log_level)
+    logging.getLogger("aiogram").setLevel(args.log_level)
+
+    session = FakeTelegramSession(latency=args.latency)
+    bot.session = session
+
+    async def transript(_) -> str:
+        await asyncio.sleep(args.openai_latency)
+        return "Гости просили сделать музыку потише"
+
+    openai_repository.transript = transript
+
+    results = []
+    first_user_id = 10_000
+    for concurrency in args.concurrency:
+        results.append(
+            await run_level(
+                bot, dp, session, concurrency, args.rounds, settings.secret_for_waiter.get_secret_value(), first_user_id
+            )
+        )
+        first_user_id += 2 * concurrency  # new chats for every level
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", default="1,8,32,128", help="comma-separated numbers of staff chats")
+    parser.add_argument("--rounds", type=int, default=3, help="feedback submissions per staff chat")
+    parser.add_argument("--latency", type=float, default=0.05, help="latency of every fake Bot API call, seconds")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="latency of a transcription, seconds")
+    parser.add_argument("--log-level", default="ERROR", help="level of the bot's loggers during the run")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    results = asyncio.run(run(args))
+
+    print("| Chats | Updates | Errors | Updates/s | p50, ms | p99, ms | SQL/update | API calls/update |")
+    print("|---:|---:|---:|---:|---:|---:|---:|---:|")
+    for result in results:
+        print(
+            f"| {result['concurrency']} | {result['updates']} | {result['errors']} | {result['throughput']:.1f}"
+            f" | {result['p50'] * 1000:.1f} | {result['p99'] * 1000:.1f} | {result['sql']:.1f} | {result['api']:.1f} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Synthetic reviews and staff reports for benchmarks and load checks.
+
+`toweco_reviews` are shaped like `private.getReviews` results, `staff_messages` like aiogram messages stored by
+the staff reports dialog (`REPORT_MESSAGE_FIELDS`), `staff_report_rows` like rows of the `waiter_reports` table.
+Staff reports need the bot settings (repositories are imported on use), reviews don't.
+"""
+
+import datetime
+import random
+
+from aiogram.types import Message
+
+from src.bot.providers import PROVIDERS
+
+FIRST_NAMES = ["Айгерим", "Бибигуль", "Данияр", "Ержан", "Мария", "Алексей", "Bekbolat", "Saule"]
+LAST_NAMES = ["Ахметова", "Сейткали", "Иванов", "Urbaev", None]
+PHRASES = [
+    "Вкусная кухня, очень вежливый персонал",
+    "Долго ждали заказ, кофе остыл",
+    "Отличные десерты и уютная атмосфера",
+    "Официант забыл про наш столик",
+    "Гости хвалили завтраки, просили добавить безлактозное молоко",
+    "Музыка слишком громкая вечером",
+    "Всё понравилось, придём ещё!",
+]
+RATINGS = [1, 2, 3, 4, 4, 5, 5, 5]
+
+
+def _published_at(rng: random.Random, now: datetime.datetime, days: int) -> datetime.datetime:
+    return now - datetime.timedelta(seconds=rng.random() * days * 24 * 60 * 60)
+
+
+def _text(rng: random.Random) -> str:
+    return ". ".join(rng.sample(PHRASES, rng.randint(1, 3)))
+
+
+def toweco_reviews(count: int, days: int = 14, seed: int = 108) -> list[dict]:
+    """Reviews as returned by `toweco_repository.get_reviews`, sorted by publication time"""
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.UTC)
+    providers = [provider["name"] for provider in PROVIDERS]
+    reviews = [
+        {
+            "publishedAt": _published_at(rng, now, days).isoformat(),
+            "provider": rng.choice(providers),
+            "location": "Fika",
+            "address": "Казахстан, г Алматы, Алмалинский р-н, ул Кабанбай Батыра, д 104",
+            "locationURL": "https://2gis.ru/firm/70000001081672623",
+            "review": _text(rng),
+            "reviewURL": "",
+            "answer": "",
+            "answerURL": "",
+            "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES) or ''}".strip(),
+            "authorURL": "",
+            "rating": rng.choice(RATINGS),
+        }
+        for _ in range(count)
+    ]
+    reviews.sort(key=lambda review: review["publishedAt"])
+    return reviews
+
+
+def staff_messages(count: int, days: int = 14, seed: int = 108) -> list[dict]:
+    """Staff report messages as stored by the staff reports dialog: text, caption or transcribed voice"""
+    from src.bot.waiter_repository import REPORT_MESSAGE_FIELDS
+
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.UTC)
+    messages = []
+    for message_id in range(1, count + 1):
+        user_id = rng.randint(1, 30)
+        kind = rng.choice(["text", "text", "text", "caption", "voice"])
+        message = Message.model_validate(
+            {
+                "message_id": message_id,
+                "date": _published_at(rng, now, days),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {
+                    "id": user_id,
+                    "is_bot": False,
+                    "first_name": rng.choice(FIRST_NAMES),
+                    "last_name": rng.choice(LAST_NAMES),
+                    "username": rng.choice([None, f"staff{user_id}"]),
+                },
+                **({"text": _text(rng)} if kind == "text" else {}),
+                **({"caption": _text(rng), "photo": []} if kind == "caption" else {}),
+                **(
+                    {"voice": {"file_id": f"voice{message_id}", "file_unique_id": "v", "duration": 9}}
+                    if kind == "voice"
+                    else {}
+                ),
+            }
+        )
+        as_dict = message.model_dump(include=REPORT_MESSAGE_FIELDS, exclude_none=True)
+        if kind == "voice":
+            as_dict["transcription"] = _text(rng)
+        messages.append(as_dict)
+    return messages
+
+
+def staff_report_rows(count: int, days: int = 14, seed: int = 108) -> list[tuple]:
+    """Rows of the `waiter_reports` table: (report_id, waiter_id, date, message)"""
+    from src.bot.waiter_repository import waiter_repository
+
+    return [
+        (
+            report_id,
+            message["from_user"]["id"],
+            datetime.datetime.fromtimestamp(message["date"], datetime.UTC).isoformat(),
+            waiter_repository._encode_message(message),
+        )
+        for report_id, message in enumerate(staff_messages(count, days, seed), start=1)
+    ]
+
+
+def staff_reports(count: int, days: int = 14, seed: int = 108) -> list[dict]:
+    """Staff reports in the review format, as returned by `waiter_repository.get_reports`"""
+    from src.bot.waiter_repository import waiter_repository
+
+    reports = [waiter_repository.to_toweco_format(row) for row in staff_report_rows(count, days, seed)]
+    reports.sort(key=lambda report: report["publishedAt"])
+    return reports
@@ -7,7 +7,12 @@ os.chdir(BASE_DIR)
 
 prepare()
 
-from src.bot.app import main  # noqa: E402
+import sys  # noqa: E402
+
+from src.bot.app import main, worker  # noqa: E402
 
 # NOTE: No need for if __name__ == "__main__":, because this is the __main__.py module already
-asyncio.run(main())
+if sys.argv[1:] == ["worker"]:
+    asyncio.run(worker())
+else:
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+import datetime
+from collections import defaultdict
+
+from dateutil import tz
+
+from src.bot.db import conn, cur
+
+ALMATY = tz.gettz("Asia/Almaty")
+
+
+def local_day(published_at: str | datetime.datetime) -> datetime.date:
+    if isinstance(published_at, str):
+        published_at = datetime.datetime.fromisoformat(published_at)
+    return published_at.astimezone(ALMATY).date()
+
+
+class AnalyticsRepository:
+    """
+    Daily rollups of reviews (per provider) and staff reports (per role).
+
+    Reads for long windows cost O(days) rows instead of O(reviews).
+    """
+
+    def record_reviews(self, reviews: list[dict], date_from: datetime.date, date_to: datetime.date) -> None:
+        """
+        Replace the review rollup for days from `date_from` to `date_to` with aggregates of `reviews` and mark the
+        finished days among them as fetched
+        """
+        rollup = defaultdict(lambda: [0, 0, 0, 0, 0, 0, 0])  # count, rating sum, histogram 1..5
+        for review in reviews:
+            row = rollup[(local_day(review["publishedAt"]), review.get("provider") or "")]
+            rating = review.get("rating", 0)
+            row[0] += 1
+            row[1] += rating
+            if 1 <= rating <= 5:
+                row[1 + rating] += 1
+
+        cur.execute("DELETE FROM review_daily_rollup WHERE day BETWEEN ? AND ?", (date_from, date_to))
+        cur.executemany(
+            "INSERT INTO review_daily_rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(day, provider, *row) for (day, provider), row in rollup.items() if date_from <= day <= date_to],
+        )
+        # today isn't over yet, so it's fetched again until it is
+        last_complete = min(date_to, local_day(datetime.datetime.now(datetime.UTC)) - datetime.timedelta(days=1))
+        cur.executemany(
+            "INSERT OR IGNORE INTO review_rollup_days (day) VALUES (?)",
+            [(date_from + datetime.timedelta(days=i),) for i in range((last_complete - date_from).days + 1)],
+        )
+        conn.commit()
+
+    def record_report(self, published_at: datetime.datetime, role: str | None) -> None:
+        """
+        Count a new staff report, committed together with the report by the caller
+        """
+        cur.execute(
+            "INSERT INTO report_daily_rollup (day, role, count) VALUES (?, ?, 1)"
+            " ON CONFLICT (day, role) DO UPDATE SET count = count + 1",
+            (local_day(published_at), role or ""),
+        )
+
+    def rebuild_report_rollup(self) -> None:
+        """
+        Fill the staff report rollup from stored reports (for databases created before the rollup existed)
+        """
+        cur.execute("SELECT 1 FROM report_daily_rollup LIMIT 1")
+        if cur.fetchone():
+            return
+        cur.execute("SELECT date, role FROM waiter_reports")
+        rollup = defaultdict(int)
+        for date, role in cur.fetchall():
+            rollup[(local_day(date), role or "")] += 1
+        cur.executemany(
+            "INSERT INTO report_daily_rollup VALUES (?, ?, ?)", [(*key, count) for key, count in rollup.items()]
+        )
+        conn.commit()
+
+    def get_missing_ranges(
+        self, date_from: datetime.date, date_to: datetime.date
+    ) -> list[tuple[datetime.date, datetime.date]]:
+        """
+        Ranges of days from `date_from` to `date_to` for which reviews were never fetched, so the rollup lacks them
+        """
+        cur.execute("SELECT day FROM review_rollup_days WHERE day BETWEEN ? AND ?", (date_from, date_to))
+        covered = {datetime.date.fromisoformat(day) for (day,) in cur.fetchall()}
+        ranges = []
+        day = date_from
+        while day <= date_to:
+            if day in covered:
+                day += datetime.timedelta(days=1)
+                continue
+            start = day
+            while day + datetime.timedelta(days=1) <= date_to and day + datetime.timedelta(days=1) not in covered:
+                day += datetime.timedelta(days=1)
+            ranges.append((start, day))
+            day += datetime.timedelta(days=1)
+        return ranges
+
+    def get_review_days(self, date_from: datetime.date) -> list[tuple[datetime.date, int, int]]:
+        """
+        (day, count, rating sum) for every day with reviews
+        """
+        cur.execute(
+            "SELECT day, SUM(count), SUM(rating_sum) FROM review_daily_rollup WHERE day >= ? GROUP BY day ORDER BY day",
+            (date_from,),
+        )
+        return [(datetime.date.fromisoformat(day), count, rating_sum) for day, count, rating_sum in cur.fetchall()]
+
+    def get_rating_histogram(self, date_from: datetime.date) -> dict[int, int]:
+        cur.execute(
+            "SELECT SUM(rating_1), SUM(rating_2), SUM(rating_3), SUM(rating_4), SUM(rating_5)"
+            " FROM review_daily_rollup WHERE day >= ?",
+            (date_from,),
+        )
+        return {rating: count or 0 for rating, count in enumerate(cur.fetchone(), 1)}
+
+    def get_providers(self, date_from: datetime.date) -> list[tuple[str, int, int]]:
+        """
+        (provider, count, rating sum), most popular first
+        """
+        cur.execute(
+            "SELECT provider, SUM(count) AS total, SUM(rating_sum) FROM review_daily_rollup WHERE day >= ?"
+            " GROUP BY provider ORDER BY total DESC",
+            (date_from,),
+        )
+        return cur.fetchall()
+
+    def get_report_roles(self, date_from: datetime.date) -> list[tuple[str, int]]:
+        """
+        (role, count) of staff reports, most active first
+        """
+        cur.execute(
+            "SELECT role, SUM(count) AS total FROM report_daily_rollup WHERE day >= ?"
+            " GROUP BY role ORDER BY total DESC",
+            (date_from,),
+        )
+        return cur.fetchall()
+
+
+analytics_repository: AnalyticsRepository = AnalyticsRepository()
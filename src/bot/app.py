@@ -1,5 +1,8 @@
 import asyncio
+import datetime
+import hashlib
 import json
+import signal
 from io import BytesIO
 from time import perf_counter
 
@@ -12,15 +15,23 @@ from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
 from aiogram.types import ErrorEvent
 from aiogram_dialog import DialogManager, StartMode, setup_dialogs
 from aiogram_dialog.api.exceptions import UnknownIntent, UnknownState
+from redis.asyncio import Redis
 
-from src.bot.daily_report import daily_report_loop, summary_report_loop
+from src.bot import metrics
+from src.bot.analytics_repository import analytics_repository
+from src.bot.bot_state_repository import bot_state_repository
+from src.bot.daily_report import archive_old_reports, register_report_jobs, warm_up_renderers
 from src.bot.dispatcher import CustomDispatcher
+from src.bot.feedback_relay import feedback_relay
 from src.bot.filters import get_statuses
+from src.bot.leader import leadership
 from src.bot.logging_ import logger
-from src.bot.middlewares import LogAllEventsMiddleware
+from src.bot.middlewares import ConcurrencyLimitMiddleware, LogAllEventsMiddleware
 from src.bot.openai_repository import openai_repository
-from src.bot.toweco_repository import toweco_repository
-from src.bot.utils import check_commands_equality
+from src.bot.outbox_repository import outbox_repository
+from src.bot.scheduler import Scheduler
+from src.bot.send_queue import SendQueue
+from src.bot.utils import check_commands_equality, commands_type_adapter
 from src.bot.waiter_repository import waiter_repository
 from src.config import settings
 
@@ -36,6 +47,20 @@ else:
     storage = MemoryStorage()
     logger.info("Using Memory storage")
 dp = CustomDispatcher(storage=storage)
+dp.update.outer_middleware(metrics.UpdateMetricsMiddleware())
+if settings.send_rate_limit:
+    bot.session.middleware(
+        SendQueue(
+            settings.send_rate_limit,
+            settings.chat_send_rate_limit,
+            settings.group_send_rate_limit,
+            # limits shared with the other replicas and the workers
+            redis=Redis.from_url(settings.redis_url.get_secret_value()) if settings.redis_url else None,
+        )
+    )
+bot.session.middleware(metrics.TelegramRequestMetrics())
+metrics.transcription_backlog.callback = waiter_repository.count_not_yet_transcripted
+metrics.feedback_outbox_size.callback = outbox_repository.count
 log_all_events_middleware = LogAllEventsMiddleware()
 dp.message.middleware(log_all_events_middleware)
 dp.callback_query.middleware(log_all_events_middleware)
@@ -74,40 +99,68 @@ dp.include_router(waiter_router)  # user model
 setup_dialogs(dp)
 
 
+def bot_profile_fingerprint() -> str:
+    """
+    Hash of the bot profile from settings (name, descriptions, commands) together with the bot id
+    """
+    profile = [
+        bot.id,
+        settings.bot_name,
+        settings.bot_description,
+        settings.bot_short_description,
+        commands_type_adapter.dump_python(settings.bot_commands or [], mode="json"),
+    ]
+    return hashlib.sha256(json.dumps(profile, ensure_ascii=False).encode()).hexdigest()
+
+
+async def sync_bot_profile() -> str:
+    """
+    Apply bot name, description and commands from settings if they differ, return bot username
+    """
+    scope = types.BotCommandScopeDefault()
+    name, description, short_description, commands, me = await asyncio.gather(
+        bot.get_my_name(),
+        bot.get_my_description(),
+        bot.get_my_short_description(),
+        bot.get_my_commands(scope=scope),
+        bot.me(),
+    )
+    updates = {}
+    if settings.bot_name and name.name != settings.bot_name:
+        updates["name"] = bot.set_my_name(settings.bot_name)
+    if settings.bot_description and description.description != settings.bot_description.strip():
+        updates["description"] = bot.set_my_description(settings.bot_description)
+    if settings.bot_short_description and short_description.short_description != settings.bot_short_description.strip():
+        updates["short description"] = bot.set_my_short_description(settings.bot_short_description)
+    if settings.bot_commands and not check_commands_equality(commands, settings.bot_commands):
+        logger.info(f"Was: {commands}; New: {settings.bot_commands}")
+        updates["commands"] = bot.set_my_commands(settings.bot_commands, scope=scope)
+    for what, success in zip(updates, await asyncio.gather(*updates.values())):
+        logger.info(f"Bot {what} updated. Success: {success}")
+    return me.username
+
+
 @dp.startup()
 async def on_startup():
     logger.info("Bot starting...")
-    # Set bot name, description and commands
-    scope = types.BotCommandScopeDefault()
-    existing_bot = {
-        "name": (await bot.get_my_name()).name,
-        "description": (await bot.get_my_description()).description,
-        "shortDescription": (await bot.get_my_short_description()).short_description,
-        "commands": await bot.get_my_commands(scope=scope),
-        "username": (await bot.me()).username,
-    }
-    if settings.bot_name and existing_bot["name"] != settings.bot_name:
-        _ = await bot.set_my_name(settings.bot_name)
-        logger.info(f"Bot name updated. Success {_}")
-    if settings.bot_description and existing_bot["description"] != settings.bot_description.strip():
-        _ = await bot.set_my_description(settings.bot_description)
-        logger.info(f"Bot description updated. Success: {_}")
-    if settings.bot_short_description and existing_bot["shortDescription"] != settings.bot_short_description.strip():
-        _ = await bot.set_my_short_description(settings.bot_short_description)
-        logger.info(f"Bot short description updated. Succes: {_}")
-    if settings.bot_commands and not check_commands_equality(existing_bot["commands"], settings.bot_commands):
-        logger.info(f"Was: {existing_bot['commands']}; New: {settings.bot_commands}")
-        _ = await bot.set_my_commands(settings.bot_commands, scope=scope)
-        logger.info(f"Bot commands updated. Success: {_}.")
-    await toweco_repository.auth()
-    logger.info(f"Bot started https://t.me/{existing_bot['username']} in {perf_counter() - _time1:.2f} sec.")
+    # Set bot name, description and commands, skip the round trips if they were applied by the previous run
+    fingerprint = bot_profile_fingerprint()
+    username = bot_state_repository.get("username")
+    if username and bot_state_repository.get("profile_fingerprint") == fingerprint:
+        logger.info("Bot profile is up to date")
+    else:
+        username = await sync_bot_profile()
+        bot_state_repository.set(profile_fingerprint=fingerprint, username=username)
+    logger.info(f"Bot started https://t.me/{username} in {perf_counter() - _time1:.2f} sec.")
+
+    analytics_repository.rebuild_report_rollup()
+    archive_old_reports()
 
     not_yet_transcripted_reports = waiter_repository.get_not_yet_transcripted()
     if not_yet_transcripted_reports:
         logger.info(f"Transcripting {len(not_yet_transcripted_reports)} reports")
-        for report_id, waiter_id, date, message in not_yet_transcripted_reports:
+        for report_id, waiter_id, date, as_dict in not_yet_transcripted_reports:
             try:
-                as_dict = json.loads(message)
                 file = await bot.get_file(as_dict["voice"]["file_id"])
                 buffer = BytesIO()
                 await bot.download_file(file_path=file.file_path, destination=buffer)
@@ -116,7 +169,7 @@ async def on_startup():
                 transcription = await openai_repository.transript(buffer)
                 as_dict["transcription"] = transcription
                 logger.info(f"Transcripted <{report_id}>: {transcription}")
-                waiter_repository.update_report(report_id, json.dumps(as_dict))
+                waiter_repository.update_report(report_id, as_dict)
             except Exception as e:
                 logger.error(f"Error while transcription voice message {e}")
 
@@ -127,13 +180,77 @@ async def on_shutdown():
 
 
 async def main():
-    # Drop pending updates
-    await bot.delete_webhook(drop_pending_updates=True)
-    asyncio.create_task(daily_report_loop())
-    asyncio.create_task(summary_report_loop())  # PDF сводка 15-го и в последний день месяца
-    # Start long-polling
+    asyncio.create_task(leadership.run())
+    asyncio.create_task(feedback_relay.run())
+    scheduler = Scheduler(
+        prepare_ahead=datetime.timedelta(minutes=settings.report_prepare_minutes),
+        catch_up=datetime.timedelta(hours=settings.report_catch_up_hours),
+    )
+    register_report_jobs(scheduler)  # ежедневный отчёт и PDF сводка 15-го и в последний день месяца
+    asyncio.create_task(scheduler.run())
+    if settings.warm_up_renderers:
+        asyncio.create_task(warm_up_renderers())
+    metrics_runner = None
+    if settings.metrics_port:
+        metrics_runner = await metrics.start_metrics_server(settings.metrics_host, settings.metrics_port)
+        asyncio.create_task(metrics.monitor_event_loop_lag())
+    if settings.update_streams:
+        from src.bot.update_streams import StreamProducerMiddleware
+
+        # handled by `worker` processes
+        dp.update.outer_middleware(
+            StreamProducerMiddleware(update_streams_redis(), settings.update_streams, settings.update_stream_maxlen)
+        )
+    try:
+        if settings.webhook_url:
+            from src.bot.webhook import run_webhook
+
+            await run_webhook(
+                dp,
+                bot,
+                url=settings.webhook_url,
+                host=settings.webhook_host,
+                port=settings.webhook_port,
+                secret_token=settings.webhook_secret.get_secret_value() if settings.webhook_secret else None,
+                limit=settings.handler_concurrency,
+                drop_pending_updates=settings.drop_pending_updates,
+            )
+        else:
+            # Start long-polling, updates received while the bot was down are handled unless dropped
+            await bot.delete_webhook(drop_pending_updates=settings.drop_pending_updates)
+            # polling handles every update in its own task, the middleware caps how many of them run at a time
+            dp.update.outer_middleware(ConcurrencyLimitMiddleware(settings.handler_concurrency))
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await leadership.release()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await dp.storage.close()
+        await bot.session.close()
+
+
+def update_streams_redis():
+    if not settings.redis_url:
+        raise RuntimeError("update_streams require redis_url")
+    return Redis.from_url(settings.redis_url.get_secret_value())
+
+
+async def worker():
+    """
+    Handle updates which the main process passes through Redis streams (`update_streams`)
+    """
+    from src.bot.update_streams import UpdateWorker
+
+    if not settings.update_streams:
+        raise RuntimeError("Set update_streams to run workers")
+    redis = update_streams_redis()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_ in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_, stop.set)
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        await UpdateWorker(dp, bot, redis, settings.update_streams).run(stop)
     finally:
+        await redis.aclose()
         await dp.storage.close()
         await bot.session.close()
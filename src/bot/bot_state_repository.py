@@ -0,0 +1,19 @@
+from src.bot.db import conn, cur
+
+
+class BotStateRepository:
+    """
+    Key-value state of the bot which survives restarts
+    """
+
+    def get(self, key: str) -> str | None:
+        cur.execute("SELECT value FROM bot_state WHERE key = ?", (key,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def set(self, **values: str) -> None:
+        cur.executemany("INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)", values.items())
+        conn.commit()
+
+
+bot_state_repository: BotStateRepository = BotStateRepository()
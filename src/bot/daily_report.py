@@ -1,14 +1,19 @@
 import asyncio
-import calendar
 import datetime
+import os
 import statistics
+import tempfile
+from time import perf_counter
 
 from aiogram.exceptions import TelegramBadRequest
-from aiogram.types import BufferedInputFile, InputMediaPhoto
+from aiogram.types import BufferedInputFile, FSInputFile, InputMediaPhoto
 
+from src.bot.analytics_repository import analytics_repository
 from src.bot.logging_ import logger
+from src.bot.scheduler import Scheduler
+from src.bot.send_queue import Lane, send_lane
+from src.bot.tracing import Span, format_breakdown, report_stage, span, traced
 from src.bot.openai_repository import openai_repository
-from src.bot.plotting import happiness_chart, provider_pie_chart, rating_distribution_chart
 from src.bot.toweco_repository import toweco_repository
 from src.bot.utils import telegram_format
 from src.bot.waiter_repository import waiter_repository
@@ -20,57 +25,59 @@ def get_today():
     return datetime.datetime.now(tz=tz.gettz("Asia/Almaty")).date()
 
 
-def is_summary_day(date: datetime.date) -> bool:
-    """Проверяет, является ли день днём для генерации сводки (15-е или последний день месяца)"""
-    if date.day == 15:
-        return True
-    # Последний день месяца
-    last_day = calendar.monthrange(date.year, date.month)[1]
-    if date.day == last_day:
-        return True
-    return False
-
-
-async def daily_report_loop():
-    if not settings.daily_report_time:
-        logger.warning("Daily report time is not set")
-        return
-    await asyncio.sleep(10)  # wait for the bot to start
-    while True:
-        _now = datetime.datetime.now(datetime.UTC)
-        to_notify = datetime.datetime(
-            _now.year,
-            _now.month,
-            _now.day,
-            hour=settings.daily_report_time.hour,
-            minute=settings.daily_report_time.minute,
-            tzinfo=datetime.UTC,
+def register_report_jobs(scheduler: Scheduler) -> None:
+    """Ставит в расписание ежедневный отчёт и PDF сводку"""
+    if settings.daily_report_time:
+        time = settings.daily_report_time
+        scheduler.add(
+            "daily_report", f"{time.minute} {time.hour} * * *", "UTC", run=daily_report, prepare=prepare_daily_report
         )
-        if _now >= to_notify:
-            logger.info("Daily report time has passed. Waiting until tomorrow")
-            to_notify += datetime.timedelta(days=1)
-
-        wait = (to_notify - _now).total_seconds()
-        logger.info(f"Waiting {round(wait)} seconds until next daily report: {to_notify}")
-        await asyncio.sleep(wait)
-        logger.info("Sending daily report")
+    else:
+        logger.warning("Daily report time is not set")
+    scheduler.add(
+        "summary_report",
+        settings.summary_report_schedule,
+        "Asia/Almaty",
+        run=send_summary_to_all,
+        prepare=prepare_summary,
+    )
 
-        reviews = None
 
-        today = get_today()
-        date_from = today - datetime.timedelta(days=13)
+async def prepare_daily_report() -> tuple[list, str]:
+    """Загружает отзывы и советы AI для ежедневного отчёта, заранее до времени отправки"""
+    reviews = None
+    date_from = get_today() - datetime.timedelta(days=13)
 
-        for _ in range(5):
+    for _ in range(5):
+        with report_stage("daily", "fetch_reviews") as stage:
             error_message, reviews = await fetch_reviews(date_from)
+            stage.set(reviews=len(reviews))
 
-            if error_message:
-                logger.warning(f"Coudn't fetch reviews: {error_message}")
-                await asyncio.sleep(100)
-                continue
-            else:
-                break
+        if error_message:
+            logger.warning(f"Coudn't fetch reviews: {error_message}")
+            await asyncio.sleep(100)
+            continue
+        else:
+            break
+    with report_stage("daily", "fetch_reports") as stage:
         waiter_reports = await fetch_reports(date_from)
+        stage.set(reports=len(waiter_reports))
+    with report_stage("daily", "ai_advice"):
         ai_advice = await get_ai_advice(reviews, waiter_reports)
+    return reviews, ai_advice
+
+
+async def daily_report(prepared: tuple[list, str] | None) -> None:
+    """Отправляет ежедневный отчёт в канал и админам"""
+    logger.info("Sending daily report")
+
+    # рассылка по расписанию уступает очередь ответам сотрудникам и постам в канал
+    with span("daily_report") as root, send_lane(Lane.BULK):
+        reviews, ai_advice = prepared or await prepare_daily_report()
+        # отчёты сотрудников локальные: берём свежие, с отправленными после подготовки
+        with report_stage("daily", "fetch_reports") as stage:
+            waiter_reports = await fetch_reports(get_today() - datetime.timedelta(days=13))
+            stage.set(reports=len(waiter_reports))
 
         for chat_id in [settings.fika_channel_id] + settings.admins:
             for _ in range(3):
@@ -88,95 +95,115 @@ async def daily_report_loop():
                     logger.warning("Couldn't send the report to %s. Please check: %s", chat_id, e)
                     await asyncio.sleep(100)
             await asyncio.sleep(1)
+    await send_report_timings(root)
 
+    archive_old_reports()
 
-async def summary_report_loop():
-    """Цикл для автоматической отправки PDF сводки 15-го и в последний день месяца в 10:00"""
-    await asyncio.sleep(15)  # wait for the bot to start
-
-    summary_hour = 10
-    summary_minute = 0
-
-    while True:
-        # Текущее время в Алматы
-        now_almaty = datetime.datetime.now(tz=tz.gettz("Asia/Almaty"))
-        today = now_almaty.date()
-
-        # Определяем следующую дату для отправки
-        next_summary_date = None
-
-        # Проверяем сегодня
-        if is_summary_day(today):
-            target_time = now_almaty.replace(hour=summary_hour, minute=summary_minute, second=0, microsecond=0)
-            if now_almaty < target_time:
-                next_summary_date = today
-            else:
-                # Уже прошло время, ищем следующую дату
-                next_summary_date = None
-
-        # Если сегодня не подходит, ищем следующую дату
-        if next_summary_date is None:
-            check_date = today + datetime.timedelta(days=1)
-            for _ in range(31):  # максимум месяц вперёд
-                if is_summary_day(check_date):
-                    next_summary_date = check_date
+
+async def prepare_summary() -> tuple[list, list, str] | None:
+    """
+    Загружает отзывы, отчёты сотрудников и AI-сводку для PDF заранее.
+    None, если отзывы не загрузились: send_summary загрузит их сам и сообщит об ошибке
+    """
+    date_from = get_today() - datetime.timedelta(days=13)
+    with report_stage("summary", "fetch_reviews") as stage:
+        error_message, reviews = await fetch_reviews(date_from)
+        stage.set(reviews=len(reviews))
+    if error_message:
+        logger.warning(f"Couldn't fetch reviews for PDF summary: {error_message}")
+        return None
+    with report_stage("summary", "fetch_reports") as stage:
+        waiter_reports = await fetch_reports(date_from)
+        stage.set(reports=len(waiter_reports))
+    with report_stage("summary", "ai_summary"):
+        ai_summary = await openai_repository.summary(reviews, waiter_reports)
+    return reviews, waiter_reports, ai_summary
+
+
+async def send_summary_to_all(prepared: tuple[list, list, str] | None = None):
+    """Отправляет PDF сводку в канал и всем админам"""
+    logger.info("Sending scheduled PDF summary")
+    recipients = [settings.fika_channel_id] + settings.admins
+
+    with span("summary_report") as root, send_lane(Lane.BULK):
+        # данные и AI-сводка одни на всех получателей
+        reviews, waiter_reports, ai_summary = prepared or await prepare_summary() or (None, None, None)
+        for chat_id in recipients:
+            for attempt in range(3):
+                try:
+                    error_message = await send_summary(chat_id, reviews, waiter_reports, ai_summary)
+                    if error_message:
+                        logger.warning(f"Couldn't send PDF summary to {chat_id}: {error_message}")
+                    else:
+                        logger.info(f"Successfully sent PDF summary to {chat_id}")
+                    break
+                except TelegramBadRequest as e:
+                    logger.warning(f"Couldn't send PDF summary to {chat_id}: {e}")
                     break
-                check_date += datetime.timedelta(days=1)
+                except Exception as e:
+                    logger.warning(f"Couldn't send PDF summary to {chat_id} (attempt {attempt + 1}): {e}")
+                    await asyncio.sleep(30)
+            await asyncio.sleep(2)
+    await send_report_timings(root)
 
-        if next_summary_date is None:
-            logger.error("Could not find next summary date")
-            await asyncio.sleep(3600)
-            continue
 
-        # Вычисляем время до отправки
-        target_datetime = datetime.datetime(
-            next_summary_date.year,
-            next_summary_date.month,
-            next_summary_date.day,
-            hour=summary_hour,
-            minute=summary_minute,
-            tzinfo=tz.gettz("Asia/Almaty"),
-        )
+async def send_report_timings(root: Span) -> None:
+    """Отправляет админам одну строку с длительностью этапов отчёта (`report_timings`)"""
+    if not settings.report_timings:
+        return
+    from src.bot.app import bot
 
-        wait_seconds = (target_datetime - now_almaty).total_seconds()
+    text = format_breakdown(root)
+    for chat_id in settings.admins:
+        try:
+            await bot.send_message(chat_id, text)
+        except Exception as e:
+            logger.warning(f"Couldn't send report timings to {chat_id}: {e}")
+
+
+async def warm_up_renderers():
+    """
+    Рендерит пробные графики, Mood Meter и PDF в отдельном потоке: кэш шрифтов matplotlib, регистрация шрифтов
+    reportlab и первая отрисовка фигуры не достаются первому настоящему отчёту
+    """
+    started = perf_counter()
+    try:
+        await asyncio.to_thread(_render_samples)
+    except Exception as e:
+        logger.warning(f"Couldn't warm up renderers: {e}")
+        return
+    logger.info(f"Renderers warmed up in {perf_counter() - started:.2f} sec.")
 
-        if wait_seconds > 0:
-            logger.info(
-                f"Next PDF summary scheduled for {target_datetime.strftime('%d.%m.%Y %H:%M')} "
-                f"(in {round(wait_seconds / 3600, 1)} hours)"
-            )
-            await asyncio.sleep(wait_seconds)
 
-        # Отправляем сводку
-        logger.info("Sending scheduled PDF summary")
-        await send_summary_to_all()
+def _render_samples():
+    from src.bot.pdf_report import generate_summary_pdf
+    from src.bot.plotting import happiness_chart, provider_pie_chart, rating_distribution_chart
 
+    today = get_today()
+    published_at = datetime.datetime.now(datetime.UTC).isoformat()
+    reviews = [{"publishedAt": published_at, "rating": rating, "provider": "Яндекс"} for rating in range(1, 6)]
+    for chart in (happiness_chart, provider_pie_chart, rating_distribution_chart):
+        chart(reviews, settings.chart_image)
+    aggregates = {
+        "histogram": {rating: 1 for rating in range(1, 6)},
+        "providers": [("Яндекс", len(reviews))],
+        "review_days": [(today, len(reviews), sum(review["rating"] for review in reviews))],
+    }
+    generate_summary_pdf(reviews, [], None, settings.mood_meter_image, aggregates)
+
+
+def archive_old_reports():
+    """Переносит старые отчёты сотрудников в архив согласно `report_retention_months`"""
+    if not settings.report_retention_months:
+        return
+    archived = waiter_repository.archive_reports(settings.report_retention_months)
+    if archived:
+        logger.info(f"Archived {archived} staff reports older than {settings.report_retention_months} months")
 
-async def send_summary_to_all():
-    """Отправляет PDF сводку в канал и всем админам"""
-    recipients = [settings.fika_channel_id] + settings.admins
 
-    for chat_id in recipients:
-        for attempt in range(3):
-            try:
-                error_message = await send_summary(chat_id)
-                if error_message:
-                    logger.warning(f"Couldn't send PDF summary to {chat_id}: {error_message}")
-                else:
-                    logger.info(f"Successfully sent PDF summary to {chat_id}")
-                break
-            except TelegramBadRequest as e:
-                logger.warning(f"Couldn't send PDF summary to {chat_id}: {e}")
-                break
-            except Exception as e:
-                logger.warning(f"Couldn't send PDF summary to {chat_id} (attempt {attempt + 1}): {e}")
-                await asyncio.sleep(30)
-        await asyncio.sleep(2)
-
-
-async def fetch_reviews(date_from: datetime.date) -> tuple[str | None, list]:
+async def fetch_reviews(date_from: datetime.date, date_to: datetime.date | None = None) -> tuple[str | None, list]:
     try:
-        reviews = await toweco_repository.get_reviews(date_from=date_from)
+        reviews = await toweco_repository.get_reviews(date_from=date_from, date_to=date_to)
         reviews.sort(key=lambda x: datetime.datetime.fromisoformat(x["publishedAt"]))
     except RuntimeError as e:
         if e.args:
@@ -185,6 +212,7 @@ async def fetch_reviews(date_from: datetime.date) -> tuple[str | None, list]:
                 return "Слишком много запросов к API, попробуйте через минуту", []
 
         return "Ошибка при получении отзывов", []
+    analytics_repository.record_reviews(reviews, date_from, date_to or get_today())
     if not reviews:
         return f"Отзывов с {date_from} нет", []
 
@@ -192,9 +220,7 @@ async def fetch_reviews(date_from: datetime.date) -> tuple[str | None, list]:
 
 
 async def fetch_reports(date_from: datetime.date) -> list:
-    reports = waiter_repository.get_reports(date_from)
-
-    return [waiter_repository.to_toweco_format(r) for r in reports]
+    return waiter_repository.get_reports(date_from)
 
 
 async def get_ai_advice(reviews: list, waiter_reports: list) -> str:
@@ -216,23 +242,8 @@ async def get_ai_advice(reviews: list, waiter_reports: list) -> str:
     return await openai_repository.get_advice(to_ai_reviews, to_ai_waiter_reports)
 
 
-async def send_report(
-    chat_id: int, reviews: list | None = None, waiter_reports: list | None = None, ai_advice: str | None = None
-) -> None | str:
-    from src.bot.app import bot
-
-    today = get_today()
-    date_from = today - datetime.timedelta(days=13)
-
-    if reviews is None:
-        error_message, reviews = await fetch_reviews(date_from)
-
-        if error_message:
-            return error_message
-
-    if waiter_reports is None:
-        waiter_reports = await fetch_reports(date_from)
-
+def report_text(reviews: list, waiter_reports: list, date_from: datetime.date, today: datetime.date) -> str:
+    """Текст ежедневного отчёта: общая статистика за период и отзывы с отчётами официантов за сегодня"""
     today_reviews = []
     today_reports = []
 
@@ -270,18 +281,55 @@ async def send_report(
         text += f"<b>Отчёты от официантов за сегодня ({len(today_reports)})</b>\n"
         text += "\n\n".join([toweco_repository.format_review(report) for report in today_reports])
         text += "\n\n"
+    return text
 
-    message = await bot.send_message(chat_id, text=text, parse_mode="HTML")
 
-    await message.reply_media_group(
-        media=[
-            InputMediaPhoto(media=BufferedInputFile(happiness_chart(reviews), filename="happiness_chart.png")),
-            InputMediaPhoto(media=BufferedInputFile(provider_pie_chart(reviews), filename="provider_pie_chart.png")),
+@traced("send_report")
+async def send_report(
+    chat_id: int, reviews: list | None = None, waiter_reports: list | None = None, ai_advice: str | None = None
+) -> None | str:
+    from src.bot.app import bot
+    from src.bot.plotting import happiness_chart, provider_pie_chart, rating_distribution_chart
+
+    today = get_today()
+    date_from = today - datetime.timedelta(days=13)
+
+    if reviews is None:
+        error_message, reviews = await fetch_reviews(date_from)
+
+        if error_message:
+            return error_message
+
+    if waiter_reports is None:
+        waiter_reports = await fetch_reports(date_from)
+
+    text = report_text(reviews, waiter_reports, date_from, today)
+
+    with report_stage("daily", "send_text"):
+        message = await bot.send_message(chat_id, text=text, parse_mode="HTML")
+
+    profile = settings.chart_image
+    extension = profile.format.extension
+    with report_stage("daily", "render_charts") as stage:
+        media = [
             InputMediaPhoto(
-                media=BufferedInputFile(rating_distribution_chart(reviews), filename="rating_distribution_chart.png")
+                media=BufferedInputFile(happiness_chart(reviews, profile), filename=f"happiness_chart.{extension}")
             ),
-        ],
-    )
+            InputMediaPhoto(
+                media=BufferedInputFile(
+                    provider_pie_chart(reviews, profile), filename=f"provider_pie_chart.{extension}"
+                )
+            ),
+            InputMediaPhoto(
+                media=BufferedInputFile(
+                    rating_distribution_chart(reviews, profile), filename=f"rating_distribution_chart.{extension}"
+                )
+            ),
+        ]
+        uploaded = sum(len(photo.media.data) for photo in media)
+        stage.set(bytes=uploaded)
+    with report_stage("daily", "upload_charts", bytes=uploaded):
+        await message.reply_media_group(media=media)
     if not ai_advice:
         ai_advice = await get_ai_advice(reviews, waiter_reports)
 
@@ -290,10 +338,80 @@ async def send_report(
         await message.reply(ai_advice_text, parse_mode="HTML")
 
 
-async def send_summary(chat_id: int) -> None | str:
-    """Отправляет сводку в виде PDF файла"""
+async def send_trend_report(chat_id: int, days: int) -> None | str:
+    """Отправляет отчёт за длинный период (30/90/365 дней) по дневным агрегатам"""
     from src.bot.app import bot
-    from src.bot.pdf_report import generate_summary_pdf
+    from src.bot.plotting import daily_happiness_chart
+
+    today = get_today()
+    date_from = today - datetime.timedelta(days=days - 1)
+
+    # Дни, за которые отзывы ещё не загружались (бот не работал, Toweco не отвечал), и текущий день догружаем
+    yesterday = today - datetime.timedelta(days=1)
+    failure = None
+    for start, end in analytics_repository.get_missing_ranges(date_from, today):
+        error_message, _ = await fetch_reviews(start, end)
+        if analytics_repository.get_missing_ranges(start, min(end, yesterday)):
+            failure = error_message
+            logger.warning(f"Couldn't fetch reviews from {start} to {end} for the trend report: {error_message}")
+    missing_days = sum(
+        (end - start).days + 1 for start, end in analytics_repository.get_missing_ranges(date_from, yesterday)
+    )
+    if failure and missing_days == days - 1:
+        return failure
+
+    review_days = analytics_repository.get_review_days(date_from)
+    histogram = analytics_repository.get_rating_histogram(date_from)
+    providers = analytics_repository.get_providers(date_from)
+    report_roles = analytics_repository.get_report_roles(date_from)
+
+    total = sum(count for _, count, _ in review_days)
+    if not total:
+        return f"Отзывов с {date_from} нет"
+    mean_rate = sum(rating_sum for _, _, rating_sum in review_days) / total
+    positive = histogram[4] + histogram[5]
+    negative = histogram[1] + histogram[2]
+
+    text = f"<b>Отчёт за {days} дней: с {date_from} по {today}</b>\n\n"
+    if missing_days:
+        text += f"⚠️ Нет данных об отзывах за {missing_days} дн. из {days}: отчёт неполный\n\n"
+    text += "<b>Общая статистика</b>\n"
+    text += f"Отзывы: {total} всего, {positive} 😊 {negative} 😞     ⭐️ {mean_rate:.1f}\n"
+    text += f"Дней с отзывами: {len(review_days)} из {days}\n\n"
+
+    text += "<b>Оценки</b>\n"
+    text += "\n".join(
+        f"{'★' * rating}{'☆' * (5 - rating)} {count} ({count / total * 100:.1f}%)"
+        for rating, count in sorted(histogram.items(), reverse=True)
+    )
+    text += "\n\n"
+
+    text += "<b>Площадки</b>\n"
+    text += "\n".join(
+        f"{provider or 'Без площадки'}: {count}     ⭐️ {rating_sum / count:.1f}"
+        for provider, count, rating_sum in providers
+    )
+    text += "\n\n"
+
+    text += f"<b>Отчёты от сотрудников: {sum(count for _, count in report_roles)} всего</b>\n"
+    text += "\n".join(f"{role or 'Без должности'}: {count}" for role, count in report_roles)
+
+    message = await bot.send_message(chat_id, text=text, parse_mode="HTML")
+    await message.reply_photo(
+        BufferedInputFile(
+            daily_happiness_chart(review_days, date_from, today, settings.chart_image),
+            filename=f"happiness_chart.{settings.chart_image.format.extension}",
+        )
+    )
+
+
+@traced("send_summary")
+async def send_summary(
+    chat_id: int, reviews: list | None = None, waiter_reports: list | None = None, ai_summary: str | None = None
+) -> None | str:
+    """Отправляет сводку в виде PDF файла, загружая то, что не передано"""
+    from src.bot.app import bot
+    from src.bot.pdf_report import generate_summary_pdf, write_summary_pdf
 
     today = get_today()
     date_from = today - datetime.timedelta(days=13)
@@ -305,37 +423,72 @@ async def send_summary(chat_id: int) -> None | str:
 
     try:
         # Получаем данные
-        error_message, reviews = await fetch_reviews(date_from)
-        if error_message:
-            if status_msg:
-                await status_msg.edit_text(f"❌ {error_message}")
-            return error_message
+        if reviews is None:
+            with report_stage("summary", "fetch_reviews") as stage:
+                error_message, reviews = await fetch_reviews(date_from)
+                stage.set(reviews=len(reviews))
+            if error_message:
+                if status_msg:
+                    await status_msg.edit_text(f"❌ {error_message}")
+                return error_message
 
-        waiter_reports = await fetch_reports(date_from)
+        if waiter_reports is None:
+            with report_stage("summary", "fetch_reports") as stage:
+                waiter_reports = await fetch_reports(date_from)
+                stage.set(reports=len(waiter_reports))
 
         # Получаем AI сводку
-        if status_msg:
-            await status_msg.edit_text("🤖 Генерирую AI-анализ...")
-        ai_summary = await openai_repository.summary(reviews, waiter_reports)
+        if ai_summary is None:
+            if status_msg:
+                await status_msg.edit_text("🤖 Генерирую AI-анализ...")
+            with report_stage("summary", "ai_summary"):
+                ai_summary = await openai_repository.summary(reviews, waiter_reports)
 
         # Генерируем PDF
         if status_msg:
             await status_msg.edit_text("📄 Создаю PDF...")
-        pdf_bytes = generate_summary_pdf(reviews, waiter_reports, ai_summary)
+        aggregates = {
+            "histogram": analytics_repository.get_rating_histogram(date_from),
+            "providers": [(provider, count) for provider, count, _ in analytics_repository.get_providers(date_from)],
+            "review_days": analytics_repository.get_review_days(date_from),
+        }
 
         # Считаем статистику
         mean_rating = statistics.mean([r.get("rating", 0) for r in reviews]) if reviews else 0
 
         # Отправляем файл
         filename = f"Сводка_{date_from.strftime('%d.%m')}-{today.strftime('%d.%m.%Y')}.pdf"
-        await bot.send_document(
-            chat_id,
-            document=BufferedInputFile(pdf_bytes, filename=filename),
-            caption=f"📊 Сводка за период {date_from.strftime('%d.%m.%Y')} — {today.strftime('%d.%m.%Y')}\n\n"
+        caption = (
+            f"📊 Сводка за период {date_from.strftime('%d.%m.%Y')} — {today.strftime('%d.%m.%Y')}\n\n"
             f"📝 Отзывов: {len(reviews)}\n"
             f"⭐️ Средняя оценка: {mean_rating:.1f}\n"
-            f"👥 Отчётов от сотрудников: {len(waiter_reports)}",
+            f"👥 Отчётов от сотрудников: {len(waiter_reports)}"
         )
+        if settings.summary_appendix:
+            # С приложением PDF верстается потоково во временный файл и отправляется с диска
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "summary.pdf")
+                with report_stage("summary", "render_pdf"):
+                    write_summary_pdf(
+                        path,
+                        reviews,
+                        waiter_reports,
+                        ai_summary,
+                        settings.mood_meter_image,
+                        aggregates,
+                        appendix_reports=waiter_repository.iter_reports(date_from),
+                    )
+                with report_stage("summary", "upload_pdf", bytes=os.path.getsize(path)):
+                    await bot.send_document(chat_id, document=FSInputFile(path, filename=filename), caption=caption)
+        else:
+            with report_stage("summary", "render_pdf"):
+                pdf_bytes = generate_summary_pdf(
+                    reviews, waiter_reports, ai_summary, settings.mood_meter_image, aggregates
+                )
+            with report_stage("summary", "upload_pdf", bytes=len(pdf_bytes)):
+                await bot.send_document(
+                    chat_id, document=BufferedInputFile(pdf_bytes, filename=filename), caption=caption
+                )
 
         # Удаляем статусное сообщение
         if status_msg:
@@ -2,11 +2,21 @@ import os
 import sqlite3
 
 db_path = os.getenv("DATABASE_PATH", "./data/sqlite.db")
+archive_db_path = os.getenv("ARCHIVE_DATABASE_PATH", os.path.join(os.path.dirname(db_path), "archive.db"))
 
 os.makedirs(os.path.dirname(db_path), exist_ok=True)
 conn = sqlite3.connect(db_path)
 cur = conn.cursor()
 
+# free pages of archived reports with `PRAGMA incremental_vacuum` (one-time conversion for existing databases)
+if cur.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cur.execute("VACUUM")
+
+# cold archive of old staff reports, one table per month
+os.makedirs(os.path.dirname(archive_db_path), exist_ok=True)
+cur.execute("ATTACH DATABASE ? AS archive", (archive_db_path,))
+
 # create staff table if not exists
 cur.execute(
     "CREATE TABLE IF NOT EXISTS waiters (telegram_id INTEGER PRIMARY KEY, object TEXT, role TEXT, deleted BOOLEAN DEFAULT false)"
@@ -27,6 +37,92 @@ cur.execute(
         message TEXT
     )"""
 )
+
+# add review-shaped projection columns if not exist (for existing databases)
+for column in ("review TEXT", "author TEXT", "provider TEXT", "role TEXT", "pending_voice_file_id TEXT"):
+    try:
+        cur.execute(f"ALTER TABLE waiter_reports ADD COLUMN {column}")
+    except sqlite3.OperationalError:
+        pass  # column already exists
+
+# fill projection for reports stored before the columns existed
+cur.execute(
+    """UPDATE waiter_reports SET
+        review = COALESCE(
+            json_extract(message, '$.text'),
+            json_extract(message, '$.caption'),
+            'Транскрипция: ' || json_extract(message, '$.transcription'),
+            'Нет текста'
+        ),
+        author = TRIM(
+            COALESCE(json_extract(message, '$.from_user.first_name'), '')
+            || COALESCE(' ' || json_extract(message, '$.from_user.last_name'), '')
+            || COALESCE(' @' || json_extract(message, '$.from_user.username'), '')
+        ),
+        provider = 'Отчёт от сотрудника',
+        role = (SELECT role FROM waiters WHERE waiters.telegram_id = waiter_reports.waiter_id)
+    WHERE review IS NULL"""
+)
+# mark voice reports stored before the column existed which still wait for transcription
+cur.execute(
+    """UPDATE waiter_reports SET pending_voice_file_id = json_extract(message, '$.voice.file_id')
+    WHERE typeof(message) = 'text'
+        AND json_extract(message, '$.voice') IS NOT NULL
+        AND json_extract(message, '$.transcription') IS NULL
+        AND pending_voice_file_id IS NULL"""
+)
+cur.execute("CREATE INDEX IF NOT EXISTS waiter_reports_date_idx ON waiter_reports (date)")
+cur.execute(
+    "CREATE INDEX IF NOT EXISTS waiter_reports_pending_voice_idx ON waiter_reports (report_id)"
+    " WHERE pending_voice_file_id IS NOT NULL"
+)
+
+# daily rollups for long-range analytics, maintained as reviews and reports arrive
+cur.execute(
+    """CREATE TABLE IF NOT EXISTS review_daily_rollup (
+        day DATE,
+        provider TEXT,
+        count INTEGER,
+        rating_sum INTEGER,
+        rating_1 INTEGER,
+        rating_2 INTEGER,
+        rating_3 INTEGER,
+        rating_4 INTEGER,
+        rating_5 INTEGER,
+        PRIMARY KEY (day, provider)
+    ) WITHOUT ROWID"""
+)
+cur.execute(
+    """CREATE TABLE IF NOT EXISTS report_daily_rollup (
+        day DATE,
+        role TEXT,
+        count INTEGER,
+        PRIMARY KEY (day, role)
+    ) WITHOUT ROWID"""
+)
+# days for which reviews were fetched, so their review rollup is complete
+cur.execute("CREATE TABLE IF NOT EXISTS review_rollup_days (day DATE PRIMARY KEY) WITHOUT ROWID")
+# replaced by review_rollup_days: a single lower bound doesn't show days which were never fetched
+cur.execute("DROP TABLE IF EXISTS rollup_coverage")
+# small key-value state of the bot which survives restarts
+cur.execute("CREATE TABLE IF NOT EXISTS bot_state (key TEXT PRIMARY KEY, value TEXT)")
+# staff reports waiting to be relayed to the channel, `done_steps` are the finished steps of the relay
+cur.execute(
+    """CREATE TABLE IF NOT EXISTS feedback_outbox (
+        report_id INTEGER PRIMARY KEY,
+        chat_id INTEGER,
+        message_id INTEGER,
+        role TEXT,
+        done_steps TEXT DEFAULT '',
+        channel_message_id INTEGER,
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at DATETIME
+    )"""
+)
+# scheduled jobs: cron-like spec and the last due time which was handled
+cur.execute(
+    "CREATE TABLE IF NOT EXISTS scheduled_jobs (name TEXT PRIMARY KEY, spec TEXT, timezone TEXT, last_run DATETIME)"
+)
 conn.commit()
 
 # Available roles
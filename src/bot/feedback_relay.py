@@ -0,0 +1,190 @@
+"""
+Relay of staff feedback to the channel. `add_feedback_handler` only stores the report with an outbox entry and
+thanks the staff member; the relay transcribes voice messages and posts the report to `fika_channel_id` in the
+background, retrying failed steps with backoff. By default (`feedback_relay_mode: copy`) a report is one channel
+message, `forward` posts the header, the forwarded message and the transcription separately.
+
+Steps of an entry are recorded as they finish (see `OutboxRepository`), so a retry or a restart doesn't repeat
+the steps which are done. The relay runs in the leader replica only.
+"""
+
+import asyncio
+import datetime
+import html
+from io import BytesIO
+
+from aiogram.exceptions import TelegramBadRequest
+
+from src.bot.leader import leadership
+from src.bot.logging_ import logger
+from src.bot.openai_repository import openai_repository
+from src.bot.outbox_repository import OutboxEntry, outbox_repository
+from src.bot.waiter_repository import waiter_repository
+from src.config import settings
+from src.config_schema import RelayMode
+
+SEPARATOR = "━━━━━━━━━━━━━━━━━━━━━━━━"
+MAX_ATTEMPTS = 10
+MAX_BACKOFF = 600.0
+# entries of worker processes are noticed by polling
+POLL_INTERVAL = 5.0
+CAPTION_LIMIT = 1024
+TEXT_LIMIT = 4096
+FORWARD_STEPS = {"header", "forward", "footer"}
+
+
+class FeedbackRelay:
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """A new entry was added in this process"""
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        while True:
+            await leadership.is_leader.wait()
+            self._wakeup.clear()
+            for entry in outbox_repository.get_due(datetime.datetime.now(datetime.UTC)):
+                await self.deliver(entry)
+            next_attempt_at = outbox_repository.get_next_attempt_at()
+            timeout = POLL_INTERVAL
+            if next_attempt_at is not None:
+                timeout = min(timeout, (next_attempt_at - datetime.datetime.now(datetime.UTC)).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+            except TimeoutError:
+                pass
+
+    async def deliver(self, entry: OutboxEntry) -> None:
+        try:
+            await self._relay(entry)
+        except TelegramBadRequest as e:  # e.g. the message was deleted, a retry fails the same way
+            logger.error(f"Dropping report {entry.report_id}, Telegram rejected it: {e}")
+            outbox_repository.remove(entry.report_id)
+            return
+        except Exception as e:
+            if entry.attempts + 1 >= MAX_ATTEMPTS:
+                logger.error(f"Giving up relaying report {entry.report_id} after {MAX_ATTEMPTS} attempts: {e}")
+                outbox_repository.remove(entry.report_id)
+                return
+            backoff = min(5 * 2**entry.attempts, MAX_BACKOFF)
+            logger.warning(f"Couldn't relay report {entry.report_id}, retrying in {backoff} s: {e}")
+            outbox_repository.retry_later(
+                entry, datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=backoff)
+            )
+            return
+        outbox_repository.remove(entry.report_id)
+
+    async def _relay(self, entry: OutboxEntry) -> None:
+        from src.bot.app import bot
+
+        message = waiter_repository.get_report_message(entry.report_id) or {}
+        if "voice" in message and "transcribe" not in entry.done_steps:
+            await self._transcribe(entry.report_id, message)
+            outbox_repository.step_done(entry, "transcribe")
+        transcription = message.get("transcription")
+
+        if not await self._relay_copy(entry, message, transcription):
+            await self._relay_forward(entry, transcription)
+
+        if transcription and "reply" not in entry.done_steps:
+            await bot.send_message(
+                chat_id=entry.chat_id,
+                text=f"Транскрипция:\n<blockquote>{html.escape(transcription)}</blockquote>",
+                reply_to_message_id=entry.message_id,
+                parse_mode="HTML",
+            )
+            outbox_repository.step_done(entry, "reply")
+
+    async def _relay_copy(self, entry: OutboxEntry, message: dict, transcription: str | None) -> bool:
+        """
+        The report as one channel message (`feedback_relay_mode: copy`): a composed text, or a copy of the media with
+        the header and transcription in the caption. False if it has to be forwarded instead
+        """
+        from src.bot.app import bot
+
+        if "copy" in entry.done_steps:
+            return True
+        if not message or settings.feedback_relay_mode != RelayMode.COPY or FORWARD_STEPS & set(entry.done_steps):
+            return False
+        _, author = waiter_repository.project_message(message)
+        parts = [f"{SEPARATOR}\n<b>📝 Обратная связь от {html.escape(entry.role)}:</b>\n👤 {html.escape(author)}"]
+        if body := message.get("text") or message.get("caption"):
+            parts.append(html.escape(body))
+        if transcription:
+            parts.append(f"<b>🎤 Транскрипция:</b>\n<blockquote>{html.escape(transcription)}</blockquote>")
+        composed = "\n\n".join(parts) + f"\n{SEPARATOR}"
+
+        if "text" in message and len(composed) <= TEXT_LIMIT:
+            await bot.send_message(
+                chat_id=settings.fika_channel_id, text=composed, disable_notification=True, parse_mode="HTML"
+            )
+        elif ("voice" in message or "caption" in message) and len(composed) <= CAPTION_LIMIT:
+            await bot.copy_message(
+                chat_id=settings.fika_channel_id,
+                from_chat_id=entry.chat_id,
+                message_id=entry.message_id,
+                caption=composed,
+                disable_notification=True,
+                parse_mode="HTML",
+            )
+        else:
+            logger.info(f"Report {entry.report_id} doesn't fit one message, forwarding it")
+            return False
+        outbox_repository.step_done(entry, "copy")
+        return True
+
+    async def _relay_forward(self, entry: OutboxEntry, transcription: str | None) -> None:
+        """The header, the forwarded report and the transcription reply or a separator"""
+        from src.bot.app import bot
+
+        if "header" not in entry.done_steps:
+            await bot.send_message(
+                chat_id=settings.fika_channel_id,
+                text=f"{SEPARATOR}\n<b>📝 Обратная связь от {html.escape(entry.role)}:</b>",
+                disable_notification=True,
+                parse_mode="HTML",
+            )
+            outbox_repository.step_done(entry, "header")
+
+        if "forward" not in entry.done_steps:
+            forwarded = await bot.forward_message(
+                chat_id=settings.fika_channel_id, from_chat_id=entry.chat_id, message_id=entry.message_id
+            )
+            outbox_repository.step_done(entry, "forward", channel_message_id=forwarded.message_id)
+
+        if "footer" not in entry.done_steps:
+            if transcription:
+                await bot.send_message(
+                    chat_id=settings.fika_channel_id,
+                    text=f"<b>🎤 Транскрипция:</b>\n<blockquote>{html.escape(transcription)}</blockquote>\n{SEPARATOR}",
+                    reply_to_message_id=entry.channel_message_id,
+                    disable_notification=True,
+                    parse_mode="HTML",
+                )
+            else:
+                # разделитель после сообщения без голоса
+                await bot.send_message(chat_id=settings.fika_channel_id, text=SEPARATOR, disable_notification=True)
+            outbox_repository.step_done(entry, "footer")
+
+    async def _transcribe(self, report_id: int, message: dict) -> None:
+        """Adds the transcription to `message` and the stored report; the report stays without it on errors"""
+        from src.bot.app import bot
+
+        if "transcription" in message:
+            return
+        try:
+            file = await bot.get_file(message["voice"]["file_id"])
+            buffer = BytesIO()
+            await bot.download_file(file_path=file.file_path, destination=buffer)
+            extension = file.file_path.split(".")[1]
+            buffer.name = f"file.{extension}"
+            message["transcription"] = await openai_repository.transript(buffer)
+            logger.info(f"Transcripted <{report_id}>: {message['transcription']}")
+            waiter_repository.update_report(report_id, message)
+        except Exception as e:
+            logger.error(f"Error while transcription voice message {e}")
+
+
+feedback_relay: FeedbackRelay = FeedbackRelay()
@@ -0,0 +1,22 @@
+from io import BytesIO
+
+from PIL import Image
+
+from src.config_schema import ImageFormat, ImageProfile
+
+
+def encode_image(image: Image.Image, profile: ImageProfile) -> bytes:
+    """
+    Кодирует PIL изображение согласно профилю (формат, качество, палитра)
+    """
+    buffer = BytesIO()
+    if profile.format == ImageFormat.PNG:
+        image.save(buffer, format="png", compress_level=1)  # быстрое сжатие: PNG встраивается в PDF и сжимается заново
+    elif profile.format == ImageFormat.PNG_PALETTE:
+        image = image.convert("RGB").quantize(colors=profile.colors, method=Image.Quantize.FASTOCTREE)
+        image.save(buffer, format="png", optimize=True)
+    elif profile.format == ImageFormat.WEBP:
+        image.save(buffer, format="webp", quality=profile.quality)
+    else:
+        image.convert("RGB").save(buffer, format="jpeg", quality=profile.quality)
+    return buffer.getvalue()
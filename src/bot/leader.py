@@ -0,0 +1,153 @@
+"""
+Leader election between replicas of the bot: scheduled jobs run only in the replica which holds the leader lease
+in Redis, another replica takes the lease over within `LEASE_TTL` seconds if the leader dies.
+Without `redis_url` there is a single replica and it is always the leader.
+
+Every scheduled run is also claimed by its idempotency key (`claim_run`), so a report is never sent twice, even if
+the leadership changes around the scheduled time. A claim is held for `RUN_CLAIM_TTL` and renewed while the job runs;
+the key is marked done only when the job succeeded (`finish_run`), so a run interrupted by a crash is claimed again
+by the catch-up after a restart.
+"""
+
+import asyncio
+import datetime
+import os
+import secrets
+import socket
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.bot.bot_state_repository import bot_state_repository
+from src.bot.logging_ import logger
+from src.config import settings
+
+LEADER_KEY = "fika:leader"
+RUNS_PREFIX = "fika:runs"
+LEASE_TTL = 10.0
+RENEW_INTERVAL = LEASE_TTL / 4
+RUN_KEY_TTL = datetime.timedelta(days=40)
+RUN_CLAIM_TTL = 3 * LEASE_TTL
+RUN_DONE = "done"
+
+# Lua: change a lease only if it is still held by this process
+RENEW_LEASE = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+)
+RELEASE_LEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class Leadership:
+    def __init__(self, redis: Redis | None):
+        self.redis = redis
+        # unique per process, so a claim of a previous process of the same container is told apart
+        self.name = f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(3)}"
+        self.is_leader = asyncio.Event()
+        if redis is None:
+            self.is_leader.set()
+
+    async def run(self) -> None:
+        """Try to become the leader, renew the lease while being one"""
+        if self.redis is None:
+            return
+        renew = self.redis.register_script(RENEW_LEASE)
+        ttl_ms = int(LEASE_TTL * 1000)
+        while True:
+            try:
+                if self.is_leader.is_set():
+                    held = bool(await renew(keys=[LEADER_KEY], args=[self.name, ttl_ms]))
+                else:
+                    held = bool(await self.redis.set(LEADER_KEY, self.name, nx=True, px=ttl_ms))
+            except RedisError as e:
+                logger.warning(f"Couldn't renew the leader lease: {e}")
+                held = False  # the lease may expire meanwhile, don't run jobs on a stale lease
+            if held and not self.is_leader.is_set():
+                logger.info(f"{self.name} is the leader, it runs scheduled jobs")
+                self.is_leader.set()
+            elif not held and self.is_leader.is_set():
+                logger.warning(f"{self.name} is not the leader anymore")
+                self.is_leader.clear()
+            await asyncio.sleep(RENEW_INTERVAL)
+
+    async def release(self) -> None:
+        """Give the lease up on shutdown, so that another replica takes over right away"""
+        if self.redis is None or not self.is_leader.is_set():
+            return
+        self.is_leader.clear()
+        try:
+            await self.redis.register_script(RELEASE_LEASE)(keys=[LEADER_KEY], args=[self.name])
+        except RedisError as e:
+            logger.warning(f"Couldn't release the leader lease: {e}")
+
+    async def claim_run(self, key: str) -> bool:
+        """
+        Idempotency key of a scheduled run: True if this process should do the run `key`, False if it's done. If
+        another process is doing it, waits until it finishes or its claim expires
+        """
+        owner = f"running:{self.name}"
+        if self.redis is None:
+            # a single replica: a claim of another process was left by a crash, an empty one was given up
+            state = bot_state_repository.get(f"run:{key}")
+            if state and not state.startswith("running:"):
+                return False
+            bot_state_repository.set(**{f"run:{key}": owner})
+            return True
+        ttl_ms = int(RUN_CLAIM_TTL * 1000)
+        while not await self.redis.set(f"{RUNS_PREFIX}:{key}", owner, nx=True, px=ttl_ms):
+            state = await self.redis.get(f"{RUNS_PREFIX}:{key}")
+            if state is not None and not state.startswith(b"running:"):
+                return False
+            await asyncio.sleep(RENEW_INTERVAL)
+        return True
+
+    async def keep_run(self, key: str) -> None:
+        """Renew the claim of `key` while the job runs, until cancelled"""
+        if self.redis is None:
+            return
+        renew = self.redis.register_script(RENEW_LEASE)
+        while True:
+            await asyncio.sleep(RENEW_INTERVAL)
+            try:
+                await renew(keys=[f"{RUNS_PREFIX}:{key}"], args=[f"running:{self.name}", int(RUN_CLAIM_TTL * 1000)])
+            except RedisError as e:
+                logger.warning(f"Couldn't renew the claim of {key}: {e}")
+
+    async def finish_run(self, key: str, succeeded: bool) -> None:
+        """Mark the run `key` done, or give the claim up if the job failed"""
+        if self.redis is None:
+            bot_state_repository.set(**{f"run:{key}": RUN_DONE if succeeded else ""})
+            return
+        try:
+            if succeeded:
+                await self.redis.set(f"{RUNS_PREFIX}:{key}", RUN_DONE, ex=RUN_KEY_TTL)
+            else:
+                await self.redis.register_script(RELEASE_LEASE)(
+                    keys=[f"{RUNS_PREFIX}:{key}"], args=[f"running:{self.name}"]
+                )
+        except RedisError as e:
+            logger.warning(f"Couldn't finish the claim of {key}: {e}")
+
+
+async def scheduled_run(key: str) -> bool:
+    """
+    Whether this replica should do the scheduled run `key`: waits a little for the leadership (the leader may have
+    just died), then claims the run
+    """
+    try:
+        await asyncio.wait_for(leadership.is_leader.wait(), timeout=2 * LEASE_TTL)
+    except TimeoutError:
+        logger.info(f"Skipping {key}: another replica is the leader")
+        return False
+    try:
+        claimed = await leadership.claim_run(key)
+    except RedisError as e:
+        logger.error(f"Skipping {key}: couldn't claim the run: {e}")
+        return False
+    if not claimed:
+        logger.info(f"Skipping {key}: it has already run")
+    return claimed
+
+
+leadership: Leadership = Leadership(
+    Redis.from_url(settings.redis_url.get_secret_value()) if settings.redis_url else None
+)
@@ -1,20 +1,113 @@
-__all__ = ["logger"]
+__all__ = ["logger", "dropped_log_records"]
 
+import atexit
+import functools
 import logging.config
+import logging.handlers
 import os
+import queue
+import random
 
 import yaml
 
 
+@functools.cache
+def _relative_path(pathname: str) -> str:
+    return os.path.relpath(pathname)
+
+
 class RelativePathFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
-        record.relativePath = os.path.relpath(record.pathname)
+        record.relativePath = _relative_path(record.pathname)
         return True
 
 
+class DebugSampleFilter(logging.Filter):
+    """
+    Keep only a share of DEBUG records (high-volume payloads), records of other levels pass
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records into a bounded queue without blocking, records which don't fit are dropped and counted.
+    The actual handlers are run by `QueueListener` in a background thread.
+    """
+
+    def __init__(self, queue_: queue.Queue):
+        super().__init__(queue_)
+        self.dropped = 0
+        self._unreported = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped(record.name)
+
+    def _report_dropped(self, name: str) -> None:
+        record = logging.LogRecord(
+            name=name,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg=f"Dropped {self._unreported} log records: logging queue is full",
+            args=(),
+            exc_info=None,
+        )
+        record.relativePath = _relative_path(record.pathname)
+        try:
+            self.queue.put_nowait(record)
+            self._unreported = 0
+        except queue.Full:
+            pass
+
+
+def _route_through_queue(loggers: list[logging.Logger], maxsize: int, debug_sample_rate: float) -> None:
+    """
+    Replace handlers of `loggers` with a queue handler, so that logging calls never wait for stdout or disk
+    """
+    for logger_ in loggers:
+        if not logger_.handlers:
+            continue
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize))
+        if debug_sample_rate < 1:
+            queue_handler.addFilter(DebugSampleFilter(debug_sample_rate))
+        listener = logging.handlers.QueueListener(queue_handler.queue, *logger_.handlers, respect_handler_level=True)
+        logger_.handlers = [queue_handler]
+        listener.start()
+        atexit.register(listener.stop)  # flush the rest of the queue on exit
+        _queue_handlers.append(queue_handler)
+
+
+def dropped_log_records() -> int:
+    return sum(handler.dropped for handler in _queue_handlers)
+
+
+_queue_handlers: list[DroppingQueueHandler] = []
+
 with open("logging.yaml") as f:
     config = yaml.safe_load(f)
+    queue_options = config.pop("queue", None)
     logging.config.dictConfig(config)
 
+if queue_options is not None:
+    _route_through_queue(
+        [logging.getLogger(name) for name in config.get("loggers", {})] + [logging.getLogger()],
+        maxsize=queue_options.get("maxsize", 10000),
+        debug_sample_rate=queue_options.get("debug_sample_rate", 1.0),
+    )
+
 logger = logging.getLogger("src.bot")
 logger.addFilter(RelativePathFilter())
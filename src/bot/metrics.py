@@ -0,0 +1,220 @@
+"""
+Prometheus metrics of the bot process, served in the text exposition format at `/metrics`
+"""
+
+import asyncio
+import bisect
+import contextlib
+import time
+from collections.abc import Callable, Iterator
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiohttp import web
+
+from src.bot.logging_ import dropped_log_records, logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Callable[[], float] | None = None,
+    ):
+        """
+        `callback` returns the current value of an unlabeled metric, it is called on every scrape
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+        self._values: dict[tuple[str, ...], float] = {}
+        registry.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        if self.callback is not None:
+            try:
+                self._values[()] = self.callback()
+            except Exception as e:
+                logger.warning(f"Couldn't collect {self.name}: {e}")
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # per label set: counts per bucket (the last one is +Inf), sum
+        self._histograms: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        if key not in self._histograms:
+            self._histograms[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = self._histograms[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in self._histograms.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le=le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total[0])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+registry: list[Metric] = []
+
+updates_total = Counter("fika_updates_total", "Telegram updates received, by event type", ("type",))
+handler_duration = Histogram(
+    "fika_handler_duration_seconds", "Time spent in message and callback handlers", ("handler",)
+)
+dependency_duration = Histogram(
+    "fika_dependency_duration_seconds", "Latency of calls to external services", ("service", "method")
+)
+dependency_errors_total = Counter(
+    "fika_dependency_errors_total", "Failed calls to external services", ("service", "method")
+)
+report_stage_duration = Histogram(
+    "fika_report_stage_duration_seconds", "Duration of report pipeline stages", ("report", "stage")
+)
+event_loop_lag = Histogram(
+    "fika_event_loop_lag_seconds",
+    "How late the event loop wakes up a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+send_queue_wait = Histogram(
+    "fika_send_queue_wait_seconds", "Time Bot API requests wait for rate limits in the send queue", ("lane",)
+)
+telegram_retry_after_total = Counter(
+    "fika_telegram_retry_after_total", "Bot API requests answered with RetryAfter (flood control)", ("method",)
+)
+transcription_backlog = Gauge("fika_transcription_backlog", "Voice reports waiting for transcription")
+feedback_outbox_size = Gauge("fika_feedback_outbox_size", "Staff reports waiting to be relayed to the channel")
+log_records_dropped_total = Counter(
+    "fika_log_records_dropped_total",
+    "Log records dropped because the logging queue was full",
+    callback=dropped_log_records,
+)
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+@contextlib.contextmanager
+def track_call(service: str, method: str) -> Iterator[None]:
+    """
+    Observe latency of a call to an external service, count it as failed if it raises
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        dependency_errors_total.inc(service=service, method=method)
+        raise
+    finally:
+        dependency_duration.observe(time.perf_counter() - started, service=service, method=method)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer middleware for `dp.update`: counts updates by event type
+    """
+
+    async def __call__(self, handler, event, data):
+        updates_total.inc(type=event.event_type)
+        return await handler(event, data)
+
+
+class TelegramRequestMetrics(BaseRequestMiddleware):
+    """
+    Bot session middleware: latency and errors of Bot API requests
+    """
+
+    async def __call__(self, make_request, bot, method):
+        with track_call("telegram", method.__api_method__):
+            return await make_request(bot, method)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(loop.time() - started - interval, 0))
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    async def metrics(_: web.Request) -> web.Response:
+        return web.Response(
+            body=render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics at http://{host}:{port}/metrics")
+    return runner
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import inspect
 import logging
 import os
@@ -9,6 +10,40 @@ from aiogram.dispatcher.event.handler import HandlerObject
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
 from src.bot.logging_ import logger
+from src.bot.metrics import handler_duration
+
+
+@functools.cache
+def handler_metadata(callback: Callable) -> tuple[str, str, int, str]:
+    """
+    Name, source path, line and path relative to the working directory of a handler callback, computed once per callback
+    """
+    unwrapped = inspect.unwrap(callback)
+    code = getattr(unwrapped, "__code__", None)
+    if code is not None:
+        pathname, lineno = code.co_filename, code.co_firstlineno
+    else:
+        pathname, lineno = inspect.getsourcefile(unwrapped), inspect.getsourcelines(unwrapped)[1]
+    func_name = getattr(callback, "__name__", type(callback).__name__)
+    return func_name, pathname, lineno, os.path.relpath(pathname)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Outer middleware for `dp.update`: at most `limit` updates are handled at the same time, the rest wait
+    """
+
+    def __init__(self, limit: int):
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self._semaphore:
+            return await handler(event, data)
 
 
 # noinspection PyMethodMayBeStatic
@@ -24,31 +59,19 @@ class LogAllEventsMiddleware(BaseMiddleware):
         r = await handler(event, data)
         finish_time = loop.time()
         duration = finish_time - start_time
-        try:
-            # get to `aiogram.dispatcher.event.TelegramEventObserver.trigger` method
-            frame = inspect.currentframe()
-            frame_info = inspect.getframeinfo(frame)
-            while frame is not None:
-                if frame_info.function == "trigger":
-                    _handler = frame.f_locals.get("handler")
-                    if _handler is not None:
-                        _handler: HandlerObject
-                        record = self._create_log_record(_handler, event, data, duration=duration)
-                        logger.handle(record)
-                    break
-                frame = frame.f_back
-                frame_info = inspect.getframeinfo(frame)
-        finally:
-            del frame
+        # `aiogram.dispatcher.event.TelegramEventObserver.trigger` puts the matched handler into data
+        _handler: HandlerObject | None = data.get("handler")
+        if _handler is not None:
+            handler_duration.observe(duration, handler=handler_metadata(_handler.callback)[0])
+            if logger.isEnabledFor(logging.INFO):
+                record = self._create_log_record(_handler, event, data, duration=duration)
+                logger.handle(record)
         return r
 
     def _create_log_record(
         self, handler: HandlerObject, event: TelegramObject, data: Dict[str, Any], *, duration: Optional[float] = None
     ) -> logging.LogRecord:
-        callback = handler.callback
-        func_name = callback.__name__
-        pathname = inspect.getsourcefile(callback)
-        lineno = inspect.getsourcelines(callback)[1]
+        func_name, pathname, lineno, relative_path = handler_metadata(handler.callback)
 
         event_type = type(event).__name__
         if hasattr(event, "from_user"):
@@ -81,5 +104,5 @@ class LogAllEventsMiddleware(BaseMiddleware):
             exc_info=None,
             func=func_name,
         )
-        record.relativePath = os.path.relpath(record.pathname)
+        record.relativePath = relative_path
         return record
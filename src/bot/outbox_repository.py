@@ -0,0 +1,76 @@
+import datetime
+from dataclasses import dataclass
+
+from src.bot.db import conn, cur
+
+
+@dataclass
+class OutboxEntry:
+    report_id: int
+    chat_id: int
+    message_id: int
+    role: str
+    done_steps: list[str]
+    channel_message_id: int | None
+    attempts: int
+
+
+class OutboxRepository:
+    """
+    Staff reports waiting to be relayed to the channel. Every finished step of the relay is recorded,
+    so a retry or a restart continues from the first unfinished one
+    """
+
+    def add(self, report_id: int, chat_id: int, message_id: int, role: str) -> None:
+        """Add an entry and commit it together with the report stored by the caller"""
+        cur.execute(
+            "INSERT INTO feedback_outbox (report_id, chat_id, message_id, role, next_attempt_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (report_id, chat_id, message_id, role, datetime.datetime.now(datetime.UTC)),
+        )
+        conn.commit()
+
+    def get_due(self, now: datetime.datetime) -> list[OutboxEntry]:
+        cur.execute(
+            "SELECT report_id, chat_id, message_id, role, done_steps, channel_message_id, attempts"
+            " FROM feedback_outbox WHERE next_attempt_at <= ? ORDER BY report_id",
+            (now,),
+        )
+        return [
+            OutboxEntry(report_id, chat_id, message_id, role, done_steps.split(",") if done_steps else [], *rest)
+            for report_id, chat_id, message_id, role, done_steps, *rest in cur.fetchall()
+        ]
+
+    def get_next_attempt_at(self) -> datetime.datetime | None:
+        cur.execute("SELECT MIN(next_attempt_at) FROM feedback_outbox")
+        row = cur.fetchone()
+        return datetime.datetime.fromisoformat(row[0]) if row[0] else None
+
+    def step_done(self, entry: OutboxEntry, step: str, channel_message_id: int | None = None) -> None:
+        entry.done_steps.append(step)
+        if channel_message_id is not None:
+            entry.channel_message_id = channel_message_id
+        cur.execute(
+            "UPDATE feedback_outbox SET done_steps = ?, channel_message_id = ? WHERE report_id = ?",
+            (",".join(entry.done_steps), entry.channel_message_id, entry.report_id),
+        )
+        conn.commit()
+
+    def retry_later(self, entry: OutboxEntry, next_attempt_at: datetime.datetime) -> None:
+        entry.attempts += 1
+        cur.execute(
+            "UPDATE feedback_outbox SET attempts = ?, next_attempt_at = ? WHERE report_id = ?",
+            (entry.attempts, next_attempt_at, entry.report_id),
+        )
+        conn.commit()
+
+    def remove(self, report_id: int) -> None:
+        cur.execute("DELETE FROM feedback_outbox WHERE report_id = ?", (report_id,))
+        conn.commit()
+
+    def count(self) -> int:
+        cur.execute("SELECT COUNT(*) FROM feedback_outbox")
+        return cur.fetchone()[0]
+
+
+outbox_repository: OutboxRepository = OutboxRepository()
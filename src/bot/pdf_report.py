@@ -3,42 +3,67 @@
 """
 
 import datetime
+import functools
+import itertools
 import statistics
 import os
 import math
+from collections.abc import Iterable, Iterator
 from io import BytesIO
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-from PIL import Image, ImageDraw
+from dateutil import tz
+
+from PIL import Image, ImageDraw, ImageFont
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib.colors import HexColor
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
+from reportlab.platypus import (
+    Flowable,
+    SimpleDocTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+    Image as RLImage,
+    KeepTogether,
+    PageBreak,
+)
 from reportlab.lib.enums import TA_CENTER
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.piecharts import Pie
+
+from src.bot.images import encode_image
+from src.bot.providers import PROVIDER_COLORS, UNKNOWN_PROVIDER_COLOR
+from src.bot.tracing import traced
+from src.config_schema import ImageProfile
+
+MOOD_METER_PROFILE = ImageProfile(dpi=150)
+ALMATY = tz.gettz("Asia/Almaty")
+
+# Шрифты с поддержкой кириллицы (обычный, жирный)
+FONT_PATHS = [
+    # Windows
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+    ("C:/Windows/Fonts/tahoma.ttf", "C:/Windows/Fonts/tahomabd.ttf"),
+    # Linux
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    (
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    ),
+]
 
 
 # Регистрируем шрифт с поддержкой кириллицы
 def register_fonts():
     """Регистрирует шрифты с поддержкой кириллицы"""
-    font_paths = [
-        # Windows
-        ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
-        ("C:/Windows/Fonts/tahoma.ttf", "C:/Windows/Fonts/tahomabd.ttf"),
-        # Linux
-        ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
-        (
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-        ),
-    ]
-
-    for regular, bold in font_paths:
+    for regular, bold in FONT_PATHS:
         if os.path.exists(regular) and os.path.exists(bold):
             try:
                 pdfmetrics.registerFont(TTFont("CustomFont", regular))
@@ -147,82 +172,148 @@ def create_emoji_image(emoji_type: int, size: int = 64) -> Image.Image:
     return img
 
 
-def create_mood_meter(rating: float) -> bytes:
+# Границы Mood Meter в координатах шкалы (радиус шкалы — 1), пропорции как у картинки в PDF (130 × 85 мм)
+MOOD_METER_X = (-1.1, 1.1)
+MOOD_METER_Y = (-0.24, 1.2)
+# Пикселей на единицу шкалы на каждый dpi
+MOOD_METER_PX_PER_DPI = 2.4
+# Сглаживание фона и стрелки рисованием в увеличенном масштабе
+MOOD_METER_SUPERSAMPLING = 3
+MOOD_METER_TEXT_COLOR = "#333333"
+MOOD_METER_NEEDLE_COLOR = "#1a1a1a"
+
+
+@functools.lru_cache(maxsize=8)
+def _load_bold_font(size: int) -> ImageFont.FreeTypeFont:
+    for _, bold in FONT_PATHS:
+        if os.path.exists(bold):
+            try:
+                return ImageFont.truetype(bold, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+
+def _mood_meter_point(x: float, y: float, scale: float) -> tuple[float, float]:
+    """Переводит координаты шкалы в пиксели изображения"""
+    return (x - MOOD_METER_X[0]) * scale, (MOOD_METER_Y[1] - y) * scale
+
+
+@functools.lru_cache(maxsize=4)
+def _mood_meter_background(dpi: int) -> Image.Image:
     """
-    Создаёт изображение Mood Meter
+    Статичная часть Mood Meter (секторы, смайлики, заголовок), рисуется один раз на dpi
     """
-    fig, ax = plt.subplots(figsize=(8, 5))
-    ax.set_xlim(-1.5, 1.5)
-    ax.set_ylim(-0.3, 1.3)
-    ax.set_aspect("equal")
-    ax.axis("off")
+    scale = dpi * MOOD_METER_PX_PER_DPI
+    big_scale = scale * MOOD_METER_SUPERSAMPLING
+    width = round((MOOD_METER_X[1] - MOOD_METER_X[0]) * scale)
+    height = round((MOOD_METER_Y[1] - MOOD_METER_Y[0]) * scale)
+
+    img = Image.new("RGB", (width * MOOD_METER_SUPERSAMPLING, height * MOOD_METER_SUPERSAMPLING), "white")
+    draw = ImageDraw.Draw(img)
 
     colors = ["#D32F2F", "#F57C00", "#FDD835", "#9CCC65", "#388E3C"]
 
-    # Секторы
+    # Секторы (углы PIL отсчитываются по часовой стрелке)
+    left, top = _mood_meter_point(-1.0, 1.0, big_scale)
+    right, bottom = _mood_meter_point(1.0, -1.0, big_scale)
+    edge_width = round(2 * dpi / 72 * MOOD_METER_SUPERSAMPLING)
     for i in range(5):
         start_angle = 180 - (i * 36)
         end_angle = 180 - ((i + 1) * 36)
-
-        wedge = patches.Wedge(
-            (0, 0), 1.0, end_angle, start_angle, facecolor=colors[i], edgecolor="white", linewidth=2, zorder=1
+        draw.pieslice([left, top, right, bottom], -start_angle, -end_angle, fill=colors[i])
+    for i in range(6):
+        angle_rad = math.radians(180 - i * 36)
+        draw.line(
+            [
+                _mood_meter_point(0, 0, big_scale),
+                _mood_meter_point(math.cos(angle_rad), math.sin(angle_rad), big_scale),
+            ],
+            fill="white",
+            width=edge_width,
         )
-        ax.add_patch(wedge)
 
     # Белый круг в центре
-    inner_circle = patches.Circle((0, 0), 0.5, facecolor="white", edgecolor="white", zorder=2)
-    ax.add_patch(inner_circle)
+    left, top = _mood_meter_point(-0.5, 0.5, big_scale)
+    right, bottom = _mood_meter_point(0.5, -0.5, big_scale)
+    draw.ellipse([left, top, right, bottom], fill="white")
+
+    img = img.resize((width, height), Image.Resampling.LANCZOS)
 
     # Смайлики
+    emoji_size = round(64 * 0.35 * dpi / 72)
     emoji_angles = [162, 126, 90, 54, 18]
-
     for i, angle in enumerate(emoji_angles):
         angle_rad = math.radians(angle)
-        x = 0.75 * math.cos(angle_rad)
-        y = 0.75 * math.sin(angle_rad)
+        x, y = _mood_meter_point(0.75 * math.cos(angle_rad), 0.75 * math.sin(angle_rad), scale)
+        emoji_img = create_emoji_image(i, size=64).resize((emoji_size, emoji_size), Image.Resampling.LANCZOS)
+        img.paste(emoji_img, (round(x - emoji_size / 2), round(y - emoji_size / 2)), emoji_img)
 
-        emoji_img = create_emoji_image(i, size=64)
-        imagebox = OffsetImage(emoji_img, zoom=0.35)
-        ab = AnnotationBbox(imagebox, (x, y), frameon=False, zorder=10)
-        ax.add_artist(ab)
+    draw = ImageDraw.Draw(img)
+    draw.text(
+        _mood_meter_point(0, 1.15, scale),
+        "FIKA MOOD METER",
+        fill=MOOD_METER_TEXT_COLOR,
+        font=_load_bold_font(round(14 * dpi / 72)),
+        anchor="mm",
+    )
+
+    return img
 
-    # Стрелка
+
+@traced("pdf_report.create_mood_meter")
+def create_mood_meter(rating: float, profile: ImageProfile = MOOD_METER_PROFILE) -> bytes:
+    """
+    Создаёт изображение Mood Meter: на закэшированный фон дорисовываются только стрелка и оценка
+    """
+    img = _mood_meter_background(profile.dpi).copy()
+    scale = profile.dpi * MOOD_METER_PX_PER_DPI
+
+    # Стрелка, рисуется в увеличенном масштабе только в своих границах
     angle_deg = 180 - (rating - 1) * 45
     angle_rad = math.radians(angle_deg)
 
     arrow_length = 0.95
-    arrow_x = arrow_length * math.cos(angle_rad)
-    arrow_y = arrow_length * math.sin(angle_rad)
-
     base_width = 0.08
-    base_angle1 = angle_rad + math.pi / 2
-    base_angle2 = angle_rad - math.pi / 2
-
-    triangle = plt.Polygon(
+    needle = [
+        (arrow_length * math.cos(angle_rad), arrow_length * math.sin(angle_rad)),
+        (base_width * math.cos(angle_rad + math.pi / 2), base_width * math.sin(angle_rad + math.pi / 2)),
+        (base_width * math.cos(angle_rad - math.pi / 2), base_width * math.sin(angle_rad - math.pi / 2)),
+    ]
+    points = [_mood_meter_point(x, y, scale) for x, y in needle]
+    left = math.floor(min(x for x, _ in points + [_mood_meter_point(-0.08, 0, scale)]))
+    top = math.floor(min(y for _, y in points + [_mood_meter_point(0, 0.08, scale)]))
+    right = math.ceil(max(x for x, _ in points + [_mood_meter_point(0.08, 0, scale)]))
+    bottom = math.ceil(max(y for _, y in points + [_mood_meter_point(0, -0.08, scale)]))
+
+    ss = MOOD_METER_SUPERSAMPLING
+    mask = Image.new("L", ((right - left) * ss, (bottom - top) * ss), 0)
+    mask_draw = ImageDraw.Draw(mask)
+    mask_draw.polygon([((x - left) * ss, (y - top) * ss) for x, y in points], fill=255)
+    center_x, center_y = _mood_meter_point(0, 0, scale)
+    radius = 0.08 * scale
+    mask_draw.ellipse(
         [
-            [arrow_x, arrow_y],
-            [base_width * math.cos(base_angle1), base_width * math.sin(base_angle1)],
-            [base_width * math.cos(base_angle2), base_width * math.sin(base_angle2)],
+            (center_x - radius - left) * ss,
+            (center_y - radius - top) * ss,
+            (center_x + radius - left) * ss,
+            (center_y + radius - top) * ss,
         ],
-        facecolor="#1a1a1a",
-        edgecolor="none",
-        zorder=20,
+        fill=255,
     )
-    ax.add_patch(triangle)
-
-    center_circle = patches.Circle((0, 0), 0.08, facecolor="#1a1a1a", zorder=21)
-    ax.add_patch(center_circle)
-
-    ax.text(0, 1.15, "FIKA MOOD METER", fontsize=14, fontweight="bold", ha="center", va="center", color="#333333")
-
-    ax.text(0, -0.15, f"{rating:.1f}", fontsize=18, fontweight="bold", ha="center", va="center", color="#333333")
+    mask = mask.resize((right - left, bottom - top), Image.Resampling.BOX)
+    img.paste(MOOD_METER_NEEDLE_COLOR, (left, top, right, bottom), mask)
 
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png", dpi=150, bbox_inches="tight", facecolor="white", edgecolor="none")
-    plt.close(fig)
-    buffer.seek(0)
+    draw = ImageDraw.Draw(img)
+    draw.text(
+        _mood_meter_point(0, -0.15, scale),
+        f"{rating:.1f}",
+        fill=MOOD_METER_TEXT_COLOR,
+        font=_load_bold_font(round(18 * profile.dpi / 72)),
+        anchor="mm",
+    )
 
-    return buffer.getvalue()
+    return encode_image(img, profile)
 
 
 def create_styles():
@@ -263,18 +354,189 @@ def create_styles():
     )
 
     styles.add(ParagraphStyle(name="NormalRu", fontName=FONT_NAME, fontSize=11, spaceAfter=8, leading=14))
+    styles.add(ParagraphStyle(name="SmallRu", fontName=FONT_NAME, fontSize=9, spaceAfter=6, leading=11))
 
     return styles
 
 
-def generate_summary_pdf(reviews: list, waiter_reports: list, ai_summary: str = None) -> bytes:
-    """Генерирует PDF отчёт"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer, pagesize=A4, rightMargin=20 * mm, leftMargin=20 * mm, topMargin=20 * mm, bottomMargin=20 * mm
+# Цвета оценок 1..5, как на графике «Отзывы и оценки»
+RATING_COLORS = ["#d73027", "#f46d43", "#ffc000", "#a6d96a", "#66bd63"]
+# Сколько источников показывать на круговой диаграмме, остальные — «Другие»
+MAX_PIE_PROVIDERS = 8
+CHART_WIDTH = 170 * mm
+CHART_HEIGHT = 65 * mm
+
+
+def _color(hex_color: str) -> HexColor:
+    """HexColor с поддержкой короткой записи вида #f43"""
+    if len(hex_color) == 4:
+        hex_color = "#" + "".join(c * 2 for c in hex_color[1:])
+    return HexColor(hex_color)
+
+
+def _chart_title(drawing: Drawing, title: str) -> None:
+    drawing.add(String(0, drawing.height - 12, title, fontName=FONT_BOLD, fontSize=11))
+
+
+def rating_distribution_drawing(histogram: dict[int, int]) -> Drawing:
+    """Столбчатая диаграмма количества отзывов по оценкам 1..5"""
+    drawing = Drawing(CHART_WIDTH, CHART_HEIGHT)
+    _chart_title(drawing, "Распределение оценок")
+
+    chart = VerticalBarChart()
+    chart.x, chart.y = 30, 20
+    chart.width, chart.height = CHART_WIDTH - 40, CHART_HEIGHT - 45
+    chart.data = [[histogram.get(rating, 0) for rating in range(1, 6)]]
+    chart.categoryAxis.categoryNames = [
+        f"{rating} ★" if FONT_NAME != "Helvetica" else str(rating) for rating in range(1, 6)
+    ]
+    chart.categoryAxis.labels.fontName = FONT_NAME
+    chart.valueAxis.labels.fontName = FONT_NAME
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.forceZero = True
+    chart.barLabelFormat = "%d"
+    chart.barLabels.fontName = FONT_NAME
+    chart.barLabels.nudge = 7
+    for i, color in enumerate(RATING_COLORS):
+        chart.bars[(0, i)].fillColor = HexColor(color)
+        chart.bars[(0, i)].strokeColor = None
+    drawing.add(chart)
+    return drawing
+
+
+def provider_pie_drawing(providers: list[tuple[str, int]]) -> Drawing:
+    """Круговая диаграмма отзывов по источникам; `providers` — (источник, количество) по убыванию"""
+    providers = [(name or "Неизвестно", count) for name, count in providers if count]
+    if len(providers) > MAX_PIE_PROVIDERS:
+        rest = sum(count for _, count in providers[MAX_PIE_PROVIDERS - 1 :])
+        providers = providers[: MAX_PIE_PROVIDERS - 1] + [("Другие", rest)]
+    total = sum(count for _, count in providers)
+
+    drawing = Drawing(CHART_WIDTH, CHART_HEIGHT)
+    _chart_title(drawing, "Источники отзывов")
+
+    pie = Pie()
+    pie.x, pie.y = 10, 5
+    pie.width = pie.height = CHART_HEIGHT - 25
+    pie.data = [count for _, count in providers]
+    pie.startAngle = 90
+    pie.direction = "clockwise"
+    pie.slices.strokeColor = HexColor("#FFFFFF")
+    pie.slices.strokeWidth = 0.5
+    colors = [_color(PROVIDER_COLORS.get(name, UNKNOWN_PROVIDER_COLOR)) for name, _ in providers]
+    for i, color in enumerate(colors):
+        pie.slices[i].fillColor = color
+    drawing.add(pie)
+
+    legend = Legend()
+    legend.x, legend.y = pie.x + pie.width + 25, pie.y + pie.height
+    legend.fontName = FONT_NAME
+    legend.fontSize = 9
+    legend.alignment = "right"
+    legend.columnMaximum = MAX_PIE_PROVIDERS
+    legend.colorNamePairs = [
+        (color, f"{name} — {count} ({count / total:.0%})") for color, (name, count) in zip(colors, providers)
+    ]
+    drawing.add(legend)
+    return drawing
+
+
+def daily_volume_drawing(
+    review_days: list[tuple[datetime.date, int, int]], date_from: datetime.date, date_to: datetime.date
+) -> Drawing:
+    """Количество отзывов по дням, цвет столбца — средняя оценка за день"""
+    by_day = {day: (count, rating_sum) for day, count, rating_sum in review_days}
+    days = [date_from + datetime.timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+
+    drawing = Drawing(CHART_WIDTH, CHART_HEIGHT)
+    _chart_title(drawing, "Отзывы по дням")
+
+    chart = VerticalBarChart()
+    chart.x, chart.y = 30, 20
+    chart.width, chart.height = CHART_WIDTH - 40, CHART_HEIGHT - 45
+    chart.data = [[by_day.get(day, (0, 0))[0] for day in days]]
+    chart.categoryAxis.categoryNames = [day.strftime("%d.%m") for day in days]
+    chart.categoryAxis.labels.fontName = FONT_NAME
+    chart.categoryAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontName = FONT_NAME
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.forceZero = True
+    for i, day in enumerate(days):
+        count, rating_sum = by_day.get(day, (0, 0))
+        chart.bars[(0, i)].fillColor = HexColor(
+            RATING_COLORS[min(max(round(rating_sum / count), 1), 5) - 1] if count else "#BDC3C7"
+        )
+        chart.bars[(0, i)].strokeColor = None
+    drawing.add(chart)
+    return drawing
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class StreamingStory(list):
+    """
+    Story для `doc.build`, которая подтягивает элементы из итератора по мере вёрстки.
+
+    Платипус читает story только с начала списка, поэтому в памяти одновременно лежат лишь `buffer_size` элементов.
+    """
+
+    def __init__(self, flowables: Iterable[Flowable], buffer_size: int = 64):
+        super().__init__()
+        self._source = iter(flowables)
+        self._buffer_size = buffer_size
+
+    def __len__(self) -> int:
+        missing = self._buffer_size - super().__len__()
+        if missing > 0:
+            self.extend(itertools.islice(self._source, missing))
+        return super().__len__()
+
+
+def _appendix_entry(entry: dict, styles) -> Paragraph:
+    """Отзыв или отчёт сотрудника: дата, источник, автор, оценка и текст"""
+    at = datetime.datetime.fromisoformat(entry["publishedAt"]).astimezone(ALMATY)
+    header = [at.strftime("%d.%m.%Y %H:%M"), entry.get("role") or entry.get("provider") or ""]
+    if entry.get("author"):
+        header.append(entry["author"])
+    if entry.get("rating"):
+        header.append(
+            "★" * entry["rating"] + "☆" * (5 - entry["rating"]) if FONT_NAME != "Helvetica" else f"{entry['rating']}/5"
+        )
+    text = _escape(entry.get("review") or "Нет текста").replace("\n", "<br/>")
+    return Paragraph(
+        f'<font name="{FONT_BOLD}">{_escape(" · ".join(filter(None, header)))}</font><br/>{text}', styles["SmallRu"]
     )
 
-    styles = create_styles()
+
+def appendix_flowables(reviews: Iterable[dict], waiter_reports: Iterable[dict], styles) -> Iterator[Flowable]:
+    """Приложение со всеми отзывами и отчётами сотрудников, по одному элементу на запись"""
+    yield PageBreak()
+    yield Paragraph("Приложение: отзывы", styles["HeadingRu"])
+    for review in reviews:
+        yield _appendix_entry(review, styles)
+
+    yield Paragraph("Приложение: отчёты сотрудников", styles["HeadingRu"])
+    for report in waiter_reports:
+        yield _appendix_entry(report, styles)
+
+
+def _summary_doc(output) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        output, pagesize=A4, rightMargin=20 * mm, leftMargin=20 * mm, topMargin=20 * mm, bottomMargin=20 * mm
+    )
+
+
+def summary_story(
+    reviews: list,
+    waiter_reports: list,
+    styles,
+    ai_summary: str = None,
+    mood_meter_profile: ImageProfile = MOOD_METER_PROFILE,
+    aggregates: dict | None = None,
+) -> list[Flowable]:
+    """Основная часть сводки: Mood Meter, статистика, графики и AI-анализ"""
     story = []
 
     today = datetime.date.today()
@@ -287,7 +549,7 @@ def generate_summary_pdf(reviews: list, waiter_reports: list, ai_summary: str =
         mean_rating = statistics.mean([r.get("rating", 0) for r in reviews])
 
         try:
-            mood_img_bytes = create_mood_meter(mean_rating)
+            mood_img_bytes = create_mood_meter(mean_rating, mood_meter_profile)
             mood_img = RLImage(BytesIO(mood_img_bytes), width=130 * mm, height=85 * mm)
             story.append(mood_img)
             story.append(Spacer(1, 5))
@@ -335,6 +597,18 @@ def generate_summary_pdf(reviews: list, waiter_reports: list, ai_summary: str =
             )
         )
         story.append(stats_table)
+
+        if aggregates:
+            story.append(Spacer(1, 20))
+            story.append(
+                KeepTogether(
+                    [Paragraph("Графики", styles["HeadingRu"]), rating_distribution_drawing(aggregates["histogram"])]
+                )
+            )
+            story.append(Spacer(1, 10))
+            story.append(provider_pie_drawing(aggregates["providers"]))
+            story.append(Spacer(1, 10))
+            story.append(daily_volume_drawing(aggregates["review_days"], date_from, today))
     else:
         story.append(Paragraph("Нет данных за период", styles["NormalRu"]))
 
@@ -344,8 +618,52 @@ def generate_summary_pdf(reviews: list, waiter_reports: list, ai_summary: str =
         story.append(Paragraph("AI-анализ проблем", styles["HeadingRu"]))
         for para in ai_summary.split("\n"):
             if para.strip():
-                para = para.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                story.append(Paragraph(para, styles["NormalRu"]))
+                story.append(Paragraph(_escape(para), styles["NormalRu"]))
+
+    return story
+
+
+@traced("pdf_report.generate_summary_pdf")
+def generate_summary_pdf(
+    reviews: list,
+    waiter_reports: list,
+    ai_summary: str = None,
+    mood_meter_profile: ImageProfile = MOOD_METER_PROFILE,
+    aggregates: dict | None = None,
+) -> bytes:
+    """
+    Генерирует PDF отчёт.
 
-    doc.build(story)
+    `aggregates` — готовые агрегаты за период для векторных графиков:
+    `histogram` ({оценка: количество}), `providers` ([(источник, количество)])
+    и `review_days` ([(дата, количество, сумма оценок)]).
+    """
+    buffer = BytesIO()
+    _summary_doc(buffer).build(
+        summary_story(reviews, waiter_reports, create_styles(), ai_summary, mood_meter_profile, aggregates)
+    )
     return buffer.getvalue()
+
+
+@traced("pdf_report.write_summary_pdf")
+def write_summary_pdf(
+    path: str,
+    reviews: list,
+    waiter_reports: list,
+    ai_summary: str = None,
+    mood_meter_profile: ImageProfile = MOOD_METER_PROFILE,
+    aggregates: dict | None = None,
+    appendix_reports: Iterable[dict] = (),
+) -> None:
+    """
+    Пишет PDF отчёт с приложением в файл `path`.
+
+    Приложение (все `reviews` и `appendix_reports`) верстается потоково, так что записи не собираются
+    в один список флоуаблов. `appendix_reports` можно передать итератором, например `waiter_repository.iter_reports`.
+    """
+    styles = create_styles()
+    story = itertools.chain(
+        summary_story(reviews, waiter_reports, styles, ai_summary, mood_meter_profile, aggregates),
+        appendix_flowables(reviews, appendix_reports, styles),
+    )
+    _summary_doc(path).build(StreamingStory(story))
@@ -1,62 +1,139 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import datetime
+import functools
 import io
+import threading
 import matplotlib.colors as mcolors
 from matplotlib import rcParams, ticker
+from PIL import Image
+
+from src.bot.images import encode_image
+from src.bot.providers import PROVIDER_COLORS, UNKNOWN_PROVIDER_COLOR
+from src.bot.tracing import traced
+from src.config_schema import ImageFormat, ImageProfile
 
 rcParams["text.antialiased"] = True
 
+DEFAULT_PROFILE = ImageProfile()
+
+# pyplot хранит глобальное состояние (текущая фигура), а графики могут рисоваться и в фоновом потоке (прогрев)
+_render_lock = threading.RLock()
+
+
+def _locked(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _render_lock:
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def save_figure(fig, profile: ImageProfile = DEFAULT_PROFILE, **savefig_kwargs) -> bytes:
+    """
+    Сохраняет фигуру в байты согласно профилю (формат, dpi, качество) и закрывает её
+    """
+    buf = io.BytesIO()
+    if profile.format in (ImageFormat.WEBP, ImageFormat.JPEG):
+        fig.savefig(
+            buf, format=profile.format.value, dpi=profile.dpi, pil_kwargs={"quality": profile.quality}, **savefig_kwargs
+        )
+    else:
+        fig.savefig(buf, format="png", dpi=profile.dpi, **savefig_kwargs)
+    plt.close(fig)
+
+    if profile.format == ImageFormat.PNG_PALETTE:
+        buf.seek(0)
+        return encode_image(Image.open(buf), profile)
+
+    return buf.getvalue()
+
 
-def happiness_chart(reviews) -> bytes:
+# Карта перевода месяцев на русский
+MONTH_TRANSLATION = {
+    "Jan": "Янв",
+    "Feb": "Фев",
+    "Mar": "Мар",
+    "Apr": "Апр",
+    "May": "Май",
+    "Jun": "Июн",
+    "Jul": "Июл",
+    "Aug": "Авг",
+    "Sep": "Сен",
+    "Oct": "Окт",
+    "Nov": "Ноя",
+    "Dec": "Дек",
+}
+
+# Не больше стольких столбцов подписываем оценкой и звёздами
+MAX_LABELED_BARS = 31
+# Не больше стольких подписей на оси X
+MAX_XTICKS = 31
+
+
+@traced("plotting.happiness_chart")
+@_locked
+def happiness_chart(reviews, profile: ImageProfile = DEFAULT_PROFILE) -> bytes:
     # Подготовка данных
     df = pd.DataFrame(reviews)
     df["date"] = pd.to_datetime(df["publishedAt"]).dt.date  # Извлечение только даты
     df["rating"] = df["rating"].astype(int)
 
-    # Подсчет количества отзывов на каждую дату
-    review_counts_by_date = df.groupby("date").size()
+    # Количество и сумма оценок на каждую дату
+    by_date = df.groupby("date")["rating"].agg(["size", "sum"])
 
-    # Создание диапазона дат, включая самую раннюю дату отзывов
+    # Диапазон дат, включая самую раннюю дату отзывов
     today = datetime.date.today()
     earliest_date = min(df["date"].min(), today - datetime.timedelta(days=13))
-    all_dates = pd.date_range(start=earliest_date, end=today)
-
-    # Заполнение данных нулями для отсутствующих дней
-    full_review_counts = pd.Series(0, index=all_dates)
-    for date, count in review_counts_by_date.items():
-        full_review_counts[pd.Timestamp(date)] = count
-
-    # Карта перевода месяцев на русский
-    month_translation = {
-        "Jan": "Янв",
-        "Feb": "Фев",
-        "Mar": "Мар",
-        "Apr": "Апр",
-        "May": "Май",
-        "Jun": "Июн",
-        "Jul": "Июл",
-        "Aug": "Авг",
-        "Sep": "Сен",
-        "Oct": "Окт",
-        "Nov": "Ноя",
-        "Dec": "Дек",
-    }
 
-    # Форматирование дат в русском формате
-    formatted_full_dates_russian = [
-        date.strftime("%d %b").replace(date.strftime("%b"), month_translation[date.strftime("%b")])
-        for date in full_review_counts.index
-    ]
+    return daily_happiness_chart(
+        list(zip(by_date.index, by_date["size"], by_date["sum"])),
+        date_from=earliest_date,
+        date_to=today,
+        profile=profile,
+    )
 
-    # Расчет средней шкалы счастья для доступных дат
-    daily_happiness_scores = pd.Series(None, index=full_review_counts.index, dtype=float)
-    daily_ratings = df.groupby("date")["rating"].mean()
-    for date in daily_ratings.index:
-        daily_happiness_scores[pd.Timestamp(date)] = daily_ratings[date]
 
-    # Удаляем пропуски
-    daily_happiness_scores = daily_happiness_scores.fillna(0)
+@traced("plotting.daily_happiness_chart")
+@_locked
+def daily_happiness_chart(
+    days, date_from: datetime.date, date_to: datetime.date, profile: ImageProfile = DEFAULT_PROFILE
+) -> bytes:
+    """
+    График «Отзывы и оценки» по дневным агрегатам `days`: (дата, количество отзывов, сумма оценок).
+
+    В зависимости от длины периода столбец — день, неделя или месяц, так что время отрисовки не зависит от периода.
+    """
+    all_dates = pd.date_range(start=date_from, end=date_to)
+    daily = pd.DataFrame(
+        [(pd.Timestamp(day), count, rating_sum) for day, count, rating_sum in days],
+        columns=["date", "count", "rating_sum"],
+    ).set_index("date")
+    daily = daily.groupby(level=0).sum().reindex(all_dates, fill_value=0)
+
+    # Выбор ширины столбца по длине периода
+    period_days = len(all_dates)
+    if period_days <= 31:
+        freq, label_format = "D", "%d %b"
+    elif period_days <= 26 * 7:
+        freq, label_format = "W-SUN", "%d %b"  # неделя с понедельника по воскресенье
+    else:
+        freq, label_format = "M", "%b %Y"
+    if freq == "D":
+        binned = daily
+    else:
+        binned = daily.groupby(daily.index.to_period(freq).start_time).sum()
+
+    full_review_counts = binned["count"]
+    # Средняя оценка в столбце, 0 — нет отзывов
+    happiness_scores = (binned["rating_sum"] / binned["count"].where(binned["count"] > 0)).fillna(0)
+
+    # Форматирование дат в русском формате
+    formatted_dates_russian = [
+        date.strftime(label_format).replace(date.strftime("%b"), MONTH_TRANSLATION[date.strftime("%b")])
+        for date in binned.index
+    ]
 
     # Нормализация цветов на основе шкалы счастья
     norm = mcolors.Normalize(vmin=1, vmax=5)
@@ -68,55 +145,58 @@ def happiness_chart(reviews) -> bytes:
     fig, ax = plt.subplots(figsize=(12, 6), dpi=200)
 
     # Столбцы с улучшенным градиентом цвета
-    colors = [colormap(norm(score)) for score in daily_happiness_scores]
-    bars = ax.bar(
-        full_review_counts.index, full_review_counts.values, color=colors, alpha=0.8, label="Количество отзывов"
-    )
+    positions = range(len(binned))
+    colors = [colormap(norm(score)) for score in happiness_scores]
+    bars = ax.bar(positions, full_review_counts.values, color=colors, alpha=0.8, label="Количество отзывов")
+
+    # Установка пределов для оси Y количества отзывов
+    ax.set_ylim(0, max(5, full_review_counts.max()) * 1.03)
+    ax.yaxis.set_major_locator(plt.MaxNLocator(integer=True))
 
     # Добавление текста с оценками счастья внутри столбцов
-    for bar, score in zip(bars, daily_happiness_scores):
-        height = bar.get_height()
-        score_str = f"{score:.1f}" if score > 0 else ""
-        if score == 0:
-            continue
-
-        stars_str = "★" * int(score) + "☆" * (5 - int(score))
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height / 2,  # Positioning inside the bar
-            score_str,
-            ha="center",
-            va="center",
-            fontsize=12,
-            weight="bold",
-            color="white" if height > 0 else "black",
-        )
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height / 2 - 0.2,  # Positioning inside the bar
-            stars_str,
-            ha="center",
-            va="center",
-            fontsize=8,
-            color="white" if height > 0 else "black",
-        )
+    stars_offset = ax.get_ylim()[1] * 0.04
+    if len(bars) <= MAX_LABELED_BARS:
+        for bar, score in zip(bars, happiness_scores):
+            height = bar.get_height()
+            score_str = f"{score:.1f}" if score > 0 else ""
+            if score == 0:
+                continue
+
+            stars_str = "★" * int(score) + "☆" * (5 - int(score))
+            ax.text(
+                bar.get_x() + bar.get_width() / 2,
+                height / 2,  # Positioning inside the bar
+                score_str,
+                ha="center",
+                va="center",
+                fontsize=12,
+                weight="bold",
+                color="white" if height > 0 else "black",
+            )
+            ax.text(
+                bar.get_x() + bar.get_width() / 2,
+                height / 2 - stars_offset,  # Positioning inside the bar
+                stars_str,
+                ha="center",
+                va="center",
+                fontsize=8,
+                color="white" if height > 0 else "black",
+            )
 
     ax.set_xlabel("Дата")
     ax.set_ylabel("Количество отзывов")
     ax.set_title("Отзывы и оценки")
 
-    # Установка пределов для оси Y количества отзывов
-    ax.set_ylim(0, max(5, full_review_counts.max()) * 1.03)
-    ax.yaxis.set_major_locator(plt.MaxNLocator(integer=True))
-
-    # Форматирование оси X
-    ax.set_xticks(full_review_counts.index)
-    xticks_colors = ["green" if date.date() == today else "black" for date in full_review_counts.index]
-    for tick, color in zip(ax.set_xticklabels(formatted_full_dates_russian, rotation=45), xticks_colors):
+    # Форматирование оси X, столбец с сегодняшним днём выделяем зелёным
+    step = -(-len(binned) // MAX_XTICKS)
+    today_position = binned.index.searchsorted(pd.Timestamp(date_to), side="right") - 1
+    ax.set_xticks(positions[::step])
+    xticks_colors = ["green" if position == today_position else "black" for position in positions[::step]]
+    for tick, color in zip(ax.set_xticklabels(formatted_dates_russian[::step], rotation=45), xticks_colors):
         tick.set_color(color)
 
-    total_reviews = len(reviews)
-    mean_rating = df["rating"].mean()
+    total_reviews = int(full_review_counts.sum())
+    mean_rating = binned["rating_sum"].sum() / total_reviews if total_reviews else 0
     ax.annotate(
         f"Всего отзывов: {total_reviews}\n" f"Средняя оценка: {mean_rating:.1f}\n",
         (1, 1),
@@ -128,11 +208,12 @@ def happiness_chart(reviews) -> bytes:
         fontsize=12,
         color="black",
     )
+    bin_name = {"D": "этот день", "W-SUN": "эту неделю", "M": "этот месяц"}[freq]
     fig.text(
         0.005,
         0.995,
-        "Цвет и число внутри столбца - средняя оценка за этот день\n"
-        "Высота столбца - количество отзывов за этот день",
+        f"Цвет и число внутри столбца - средняя оценка за {bin_name}\n"
+        f"Высота столбца - количество отзывов за {bin_name}",
         va="top",  # Выравнивание снизу
         ha="left",  # Выравнивание по центру
         fontsize=10,
@@ -140,49 +221,13 @@ def happiness_chart(reviews) -> bytes:
     )
 
     # Сохранение графика в байты
-    buf = io.BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-
-    return buf.getvalue()
+    return save_figure(fig, profile)
 
 
-def provider_pie_chart(reviews) -> bytes:
-    PROVIDERS = [
-        {"sign": "TO", "name": "Товеко QR-код", "color": "#FF9F00"},
-        {"sign": "YA", "name": "Яндекс", "color": "#f43"},
-        {"sign": "2G", "name": "2ГИС", "color": "#50A739"},
-        {"sign": "GL", "name": "Google", "color": "#3d83f3"},
-        {"sign": "RC", "name": "Restoclub", "color": "#ed0f08"},
-        {"sign": "FL", "name": "Фламп", "color": "#2967e8"},
-        {"sign": "ZN", "name": "Zoon", "color": "#614ba0"},
-        {"sign": "TR", "name": "Tripadvisor", "color": "#34e0a1"},
-        {"sign": "YL", "name": "Yell", "color": "#ff3b3b"},
-        {"sign": "OZ", "name": "Отзовик", "color": "#ce2457"},
-        {"sign": "IR", "name": "Irecommend", "color": "#fd6540"},
-        {"sign": "AF", "name": "Афиша", "color": "#ce1f1d"},
-        {"sign": "FC", "name": "Foursquare", "color": "#fa4778"},
-        {"sign": "TN", "name": "Т-Банк", "color": "#ffdd2d"},
-        {"sign": "NM", "name": "Нет монет", "color": "#3e3467"},
-        {"sign": "ZT", "name": "Zomato", "color": "#e33745"},
-        {"sign": "VD", "name": "Ваш Досуг", "color": "#374A3B"},
-        {"sign": "DC", "name": "Деливери", "color": "#6fe250"},
-        {"sign": "OS", "name": "Островок", "color": "#0e41d2"},
-        {"sign": "OTT", "name": "OneTwoTrip", "color": "#000"},
-        {"sign": "101H", "name": "101hotels", "color": "#ff4141"},
-        {"sign": "WAH", "name": "WhatsApp", "color": "#25d366"},
-        {"sign": "TGH", "name": "Telegram", "color": "#25a2e0"},
-        {"sign": "IGH", "name": "Instagram", "color": "#c2328b"},
-        {"sign": "VK_H", "name": "Вконтакте", "color": "#07f"},
-        {"sign": "TLF", "name": "Телефон", "color": "#fdc73e"},
-        {"sign": "EMH", "name": "Email", "color": "#F4F778"},
-        {"sign": "YE", "name": "Яндекс.Еда", "color": "#5381ae"},
-        {"sign": "DD", "name": "DOCDOC", "color": "#F0F0F0"},
-        {"sign": "NP", "name": "NAPOPRAVKU", "color": "#F0F0F0"},
-    ]
-
+@traced("plotting.provider_pie_chart")
+@_locked
+def provider_pie_chart(reviews, profile: ImageProfile = DEFAULT_PROFILE) -> bytes:
     # Подготовка данных
     df = pd.DataFrame(reviews)
 
@@ -192,11 +237,8 @@ def provider_pie_chart(reviews) -> bytes:
     # Подсчет количества отзывов для каждого провайдера
     provider_counts = df["provider"].value_counts()
 
-    # Создание карты цветов для провайдеров
-    provider_colors = {provider["name"]: provider["color"] for provider in PROVIDERS}
-
     # Упорядочивание цветов в соответствии с данными
-    colors = [provider_colors.get(name, "#cccccc") for name in provider_counts.index]
+    colors = [PROVIDER_COLORS.get(name, UNKNOWN_PROVIDER_COLOR) for name in provider_counts.index]
 
     # Построение круговой диаграммы
     fig, ax = plt.subplots(figsize=(10, 10), dpi=200)
@@ -223,16 +265,13 @@ def provider_pie_chart(reviews) -> bytes:
     ax.set_title("Распределение отзывов по площадкам", fontsize=18)
 
     # Сохранение графика в байты
-    buf = io.BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-
-    return buf.getvalue()
+    return save_figure(fig, profile)
 
 
-def rating_distribution_chart(reviews) -> bytes:
+@traced("plotting.rating_distribution_chart")
+@_locked
+def rating_distribution_chart(reviews, profile: ImageProfile = DEFAULT_PROFILE) -> bytes:
     # Подготовка данных
     df = pd.DataFrame(reviews)
     df["rating"] = df["rating"].astype(int)
@@ -277,13 +316,8 @@ def rating_distribution_chart(reviews) -> bytes:
     ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
 
     # Сохранение графика в байты
-    buf = io.BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-
-    return buf.getvalue()
+    return save_figure(fig, profile)
 
 
 if __name__ == "__main__":
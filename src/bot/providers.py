@@ -0,0 +1,39 @@
+"""
+Источники отзывов Toweco: код, название и фирменный цвет
+"""
+
+PROVIDERS = [
+    {"sign": "TO", "name": "Товеко QR-код", "color": "#FF9F00"},
+    {"sign": "YA", "name": "Яндекс", "color": "#f43"},
+    {"sign": "2G", "name": "2ГИС", "color": "#50A739"},
+    {"sign": "GL", "name": "Google", "color": "#3d83f3"},
+    {"sign": "RC", "name": "Restoclub", "color": "#ed0f08"},
+    {"sign": "FL", "name": "Фламп", "color": "#2967e8"},
+    {"sign": "ZN", "name": "Zoon", "color": "#614ba0"},
+    {"sign": "TR", "name": "Tripadvisor", "color": "#34e0a1"},
+    {"sign": "YL", "name": "Yell", "color": "#ff3b3b"},
+    {"sign": "OZ", "name": "Отзовик", "color": "#ce2457"},
+    {"sign": "IR", "name": "Irecommend", "color": "#fd6540"},
+    {"sign": "AF", "name": "Афиша", "color": "#ce1f1d"},
+    {"sign": "FC", "name": "Foursquare", "color": "#fa4778"},
+    {"sign": "TN", "name": "Т-Банк", "color": "#ffdd2d"},
+    {"sign": "NM", "name": "Нет монет", "color": "#3e3467"},
+    {"sign": "ZT", "name": "Zomato", "color": "#e33745"},
+    {"sign": "VD", "name": "Ваш Досуг", "color": "#374A3B"},
+    {"sign": "DC", "name": "Деливери", "color": "#6fe250"},
+    {"sign": "OS", "name": "Островок", "color": "#0e41d2"},
+    {"sign": "OTT", "name": "OneTwoTrip", "color": "#000"},
+    {"sign": "101H", "name": "101hotels", "color": "#ff4141"},
+    {"sign": "WAH", "name": "WhatsApp", "color": "#25d366"},
+    {"sign": "TGH", "name": "Telegram", "color": "#25a2e0"},
+    {"sign": "IGH", "name": "Instagram", "color": "#c2328b"},
+    {"sign": "VK_H", "name": "Вконтакте", "color": "#07f"},
+    {"sign": "TLF", "name": "Телефон", "color": "#fdc73e"},
+    {"sign": "EMH", "name": "Email", "color": "#F4F778"},
+    {"sign": "YE", "name": "Яндекс.Еда", "color": "#5381ae"},
+    {"sign": "DD", "name": "DOCDOC", "color": "#F0F0F0"},
+    {"sign": "NP", "name": "NAPOPRAVKU", "color": "#F0F0F0"},
+]
+
+PROVIDER_COLORS = {provider["name"]: provider["color"] for provider in PROVIDERS}
+UNKNOWN_PROVIDER_COLOR = "#cccccc"
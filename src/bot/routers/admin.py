@@ -30,6 +30,7 @@ class AdminStates(StatesGroup):
     edit_staff_role = State("edit_staff_role")
     add_feedback = State("add_feedback")
     summary = State("summary")
+    trends = State("trends")
 
 
 async def report(callback: CallbackQuery, button: Button, manager: DialogManager):
@@ -52,16 +53,37 @@ async def summary(callback: CallbackQuery, button: Button, manager: DialogManage
     await manager.switch_to(AdminStates.menu, show_mode=ShowMode.DELETE_AND_SEND)
 
 
+async def trend_report(callback: CallbackQuery, button: Button, manager: DialogManager):
+    from src.bot.daily_report import send_trend_report
+
+    days = int(button.widget_id.removeprefix("trend_"))
+    error_message = await send_trend_report(callback.from_user.id, days)
+    if error_message:
+        await callback.answer(error_message)
+    await manager.switch_to(AdminStates.menu, show_mode=ShowMode.DELETE_AND_SEND)
+
+
 admin_menu_ww = Window(
     Const(f'<a href="{settings.fika_channel_link}">Канал с отзывами</a>\n\n<b>Меню администратора 🛠</b>'),
     SwitchTo(Const("Управление сотрудниками"), id="manage_staff", state=AdminStates.manage_staff),
     SwitchTo(Const("Добавить обратную связь"), id="add_feedback", state=AdminStates.add_feedback),
     Button(Const("Сводка за 2 недели 📈"), id="summary", on_click=summary),
     Button(Const("Отчёт 📊"), id="report", on_click=report),
+    SwitchTo(Const("Тренды 📉"), id="trends", state=AdminStates.trends),
     state=AdminStates.menu,
     parse_mode="HTML",
 )
 
+trends_ww = Window(
+    Const("<b>Отчёт за период</b>"),
+    Button(Const("30 дней"), id="trend_30", on_click=trend_report),
+    Button(Const("90 дней"), id="trend_90", on_click=trend_report),
+    Button(Const("365 дней"), id="trend_365", on_click=trend_report),
+    SwitchTo(Const("◀️ Назад"), id="back", state=AdminStates.menu),
+    state=AdminStates.trends,
+    parse_mode="HTML",
+)
+
 
 async def switch_to_add_staff(callback: CallbackQuery, widget: Button, manager: DialogManager):
     await callback.message.answer(
@@ -365,5 +387,6 @@ router = Dialog(
     staff_actions_ww,
     edit_staff_role_ww,
     feedback_ww,
+    trends_ww,
     name="admin",
 )
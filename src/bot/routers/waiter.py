@@ -6,9 +6,6 @@
    Бот обрабатывает данные и формирует отдельный отчет в Telegram с указанием роли сотрудника.
 """
 
-import json
-from io import BytesIO
-
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message
 from aiogram_dialog import Dialog, DialogManager, Window
@@ -17,10 +14,10 @@ from aiogram_dialog.widgets.text import Const
 
 from aiogram_dialog.widgets.input import MessageInput
 
-from src.bot.app import bot
+from src.bot.feedback_relay import feedback_relay
 from src.bot.logging_ import logger
-from src.bot.openai_repository import openai_repository
-from src.bot.waiter_repository import waiter_repository
+from src.bot.outbox_repository import outbox_repository
+from src.bot.waiter_repository import REPORT_MESSAGE_FIELDS, waiter_repository
 from src.config import settings
 
 
@@ -83,51 +80,14 @@ async def add_feedback_handler(
 
     logger.info(f"Feedback from {user_role}: {message.text or message.caption or message.voice}")
 
-    as_dict = message.model_dump(exclude_none=True)
-
-    transcription = None
-    if message.voice:
-        try:
-            file = await bot.get_file(message.voice.file_id)
-            buffer = BytesIO()
-            await bot.download_file(file_path=file.file_path, destination=buffer)
-            extension = file.file_path.split(".")[1]
-            buffer.name = f"file.{extension}"
-            transcription = await openai_repository.transript(buffer)
-            as_dict["transcription"] = transcription
-            logger.info(f"Transcripted: {transcription}")
-        except Exception as e:
-            logger.error(f"Error while transcription voice message {e}")
-
-    waiter_repository.add_report(waiter_id=message.from_user.id, message=json.dumps(as_dict))
-
-    # Отправляем в канал с указанием роли
-    await bot.send_message(
-        chat_id=settings.fika_channel_id,
-        text=f"━━━━━━━━━━━━━━━━━━━━━━━━\n<b>📝 Обратная связь от {user_role}:</b>",
-        disable_notification=True,
-        parse_mode="HTML",
-    )
-    forwarded = await message.forward(chat_id=settings.fika_channel_id)
-
-    if transcription:
-        await forwarded.reply(
-            text=f"<b>🎤 Транскрипция:</b>\n<blockquote>{transcription}</blockquote>\n━━━━━━━━━━━━━━━━━━━━━━━━",
-            disable_notification=True,
-            parse_mode="HTML",
-        )
-        await message.reply(
-            text=f"Спасибо за обратную связь!\n\nТранскрипция:\n<blockquote>{transcription}</blockquote>",
-            parse_mode="HTML",
-        )
-    else:
-        # Добавляем разделитель после сообщения без голоса
-        await bot.send_message(
-            chat_id=settings.fika_channel_id,
-            text="━━━━━━━━━━━━━━━━━━━━━━━━",
-            disable_notification=True,
-        )
-        await message.reply("Спасибо за обратную связь!")
+    as_dict = message.model_dump(include=REPORT_MESSAGE_FIELDS, exclude_none=True)
+
+    # Отчёт и задание для канала сохраняются одной транзакцией; транскрипцию и пост в канал делает feedback_relay
+    report_id = waiter_repository.add_report(waiter_id=message.from_user.id, message=as_dict, commit=False)
+    outbox_repository.add(report_id, chat_id=message.chat.id, message_id=message.message_id, role=user_role)
+    feedback_relay.notify()
+
+    await message.reply("Спасибо за обратную связь!")
 
     # Возвращаемся в меню
     # Проверяем откуда пришли - из админки или из меню сотрудника
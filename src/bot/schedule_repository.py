@@ -0,0 +1,35 @@
+import datetime
+
+from src.bot.db import conn, cur
+
+
+class ScheduleRepository:
+    """
+    Scheduled jobs with the last due time which was handled, so that a run missed while the bot was down is noticed
+    """
+
+    def save_job(self, name: str, spec: str, timezone: str) -> None:
+        cur.execute(
+            """INSERT INTO scheduled_jobs (name, spec, timezone) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET spec = excluded.spec, timezone = excluded.timezone""",
+            (name, spec, timezone),
+        )
+        conn.commit()
+
+    def get_schedule(self, name: str) -> tuple[str, str] | None:
+        """The stored spec and time zone of the job"""
+        cur.execute("SELECT spec, timezone FROM scheduled_jobs WHERE name = ?", (name,))
+        row = cur.fetchone()
+        return tuple(row) if row else None
+
+    def get_last_run(self, name: str) -> datetime.datetime | None:
+        cur.execute("SELECT last_run FROM scheduled_jobs WHERE name = ?", (name,))
+        row = cur.fetchone()
+        return datetime.datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def set_last_run(self, name: str, due: datetime.datetime | None) -> None:
+        cur.execute("UPDATE scheduled_jobs SET last_run = ? WHERE name = ?", (due and due.isoformat(), name))
+        conn.commit()
+
+
+schedule_repository: ScheduleRepository = ScheduleRepository()
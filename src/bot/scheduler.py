@@ -0,0 +1,185 @@
+"""
+Persistent scheduler of periodic jobs (the daily report, the PDF summary).
+
+A job has a cron-like spec `minute hour day month weekday` in its time zone, e.g. `0 10 15,L * *` is 10:00 on the 15th
+and on the last day of every month. Fields accept `*`, numbers, ranges `a-b`, steps `*/n` and lists `a,b`; `L` in
+the day field is the last day of the month, weekdays are 0-7 (0 and 7 are Sunday). As in cron, a day matches if either
+the day or the weekday field matches when both are restricted.
+
+The spec and the last handled due time of every job are stored in SQLite: a run missed while the bot was down
+(restart, suspended host, a crash during the run) is done on start if it's at most `catch_up` late, after a random
+delay of up to `CATCH_UP_JITTER` seconds. A job whose spec changed since the last start has nothing to catch up.
+Waiting is done in short steps against the wall clock, so the schedule doesn't drift after a suspend.
+
+A job may have a `prepare` step which runs `prepare_ahead` before the due time (fetching reviews, AI output), its
+result is passed to `run` so that delivery happens on time. Runs go through `scheduled_run`: only the leader replica
+runs a job and only once per due time.
+"""
+
+import asyncio
+import calendar
+import datetime
+import random
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from dateutil import tz
+
+from src.bot.leader import leadership, scheduled_run
+from src.bot.logging_ import logger
+from src.bot.schedule_repository import schedule_repository
+
+CATCH_UP_JITTER = 60.0
+MAX_SLEEP = 60.0
+
+
+def _parse_field(text: str, low: int, high: int, allow_last: bool = False) -> tuple[list[int], bool]:
+    """Values of one spec field and whether it has `L`"""
+    values, last = set(), False
+    for part in text.split(","):
+        if allow_last and part == "L":
+            last = True
+            continue
+        range_, _, step = part.partition("/")
+        if range_ == "*":
+            start, stop = low, high
+        elif "-" in range_:
+            start, stop = map(int, range_.split("-"))
+        else:
+            start = stop = int(range_)
+            if step:
+                stop = high
+        if not low <= start <= stop <= high:
+            raise ValueError(f"{part!r} is out of range {low}-{high}")
+        values.update(range(start, stop + 1, int(step) if step else 1))
+    return sorted(values), last
+
+
+class Schedule:
+    def __init__(self, spec: str, timezone: str):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"Schedule {spec!r} must have 5 fields: minute hour day month weekday")
+        self.spec = spec
+        self.timezone = tz.gettz(timezone)
+        if self.timezone is None:
+            raise ValueError(f"Unknown time zone {timezone!r}")
+        self.minutes, _ = _parse_field(fields[0], 0, 59)
+        self.hours, _ = _parse_field(fields[1], 0, 23)
+        self.days, self.last_day = _parse_field(fields[2], 1, 31, allow_last=True)
+        self.months, _ = _parse_field(fields[3], 1, 12)
+        weekdays, _ = _parse_field(fields[4], 0, 7)
+        self.weekdays = {weekday % 7 for weekday in weekdays}  # 7 is Sunday too
+        # like cron: a day matches either field if both are restricted
+        self.either_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, date: datetime.date, days_in_month: int) -> bool:
+        in_days = date.day in self.days or (self.last_day and date.day == days_in_month)
+        in_weekdays = date.isoweekday() % 7 in self.weekdays
+        return in_days or in_weekdays if self.either_day else in_days and in_weekdays
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """The first due time strictly after `moment`"""
+        start = moment.astimezone(self.timezone).replace(tzinfo=None, second=0, microsecond=0)
+        start += datetime.timedelta(minutes=1)
+        year, month = start.year, start.month
+        for _ in range(12 * 8):  # the 29th of February comes at least once in 8 years
+            if month in self.months:
+                days_in_month = calendar.monthrange(year, month)[1]
+                first_day = start.day if (year, month) == (start.year, start.month) else 1
+                for day in range(first_day, days_in_month + 1):
+                    if not self._day_matches(datetime.date(year, month, day), days_in_month):
+                        continue
+                    for hour in self.hours:
+                        for minute in self.minutes:
+                            due = datetime.datetime(year, month, day, hour, minute)
+                            if due >= start:
+                                return due.replace(tzinfo=self.timezone)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        raise ValueError(f"Schedule {self.spec!r} never comes")
+
+
+@dataclass
+class Job:
+    name: str
+    schedule: Schedule
+    run: Callable[[Any], Awaitable[None]]
+    "Gets the result of `prepare`, or None if there was no prepare step or it failed"
+    prepare: Callable[[], Awaitable[Any]] | None = None
+
+
+async def _sleep_until(moment: datetime.datetime) -> None:
+    while (remaining := (moment - datetime.datetime.now(datetime.UTC)).total_seconds()) > 0:
+        await asyncio.sleep(min(remaining, MAX_SLEEP))
+
+
+class Scheduler:
+    def __init__(self, prepare_ahead: datetime.timedelta, catch_up: datetime.timedelta):
+        self.prepare_ahead = prepare_ahead
+        self.catch_up = catch_up
+        self.jobs: list[Job] = []
+
+    def add(
+        self,
+        name: str,
+        spec: str,
+        timezone: str,
+        run: Callable[[Any], Awaitable[None]],
+        prepare: Callable[[], Awaitable[Any]] | None = None,
+    ) -> None:
+        self.jobs.append(Job(name, Schedule(spec, timezone), run, prepare))
+        stored = schedule_repository.get_schedule(name)
+        if stored is not None and stored != (spec, timezone):
+            # the last run was due by the old schedule
+            logger.info(f"Schedule of {name} changed from {stored[0]!r} ({stored[1]}) to {spec!r} ({timezone})")
+            schedule_repository.set_last_run(name, None)
+        schedule_repository.save_job(name, spec, timezone)
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._run_job(job) for job in self.jobs))
+
+    async def _run_job(self, job: Job) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        last_run = schedule_repository.get_last_run(job.name)
+        if last_run is not None:
+            missed = job.schedule.next_after(max(last_run, now - self.catch_up))
+            while missed <= now and (following := job.schedule.next_after(missed)) <= now:
+                missed = following  # only the latest missed run matters
+            if missed <= now:
+                delay = random.uniform(0, CATCH_UP_JITTER)
+                logger.info(f"Catching up {job.name} due at {missed} in {round(delay)} seconds")
+                await asyncio.sleep(delay)
+                await self._fire(job, missed, prepared=None)
+        due = job.schedule.next_after(now)
+        while True:
+            logger.info(f"Next {job.name} is due at {due}")
+            prepared = None
+            if job.prepare is not None and self.prepare_ahead:
+                await _sleep_until(due - self.prepare_ahead)
+                if leadership.is_leader.is_set():
+                    try:
+                        prepared = await job.prepare()
+                    except Exception as e:
+                        logger.exception(f"Couldn't prepare {job.name}, it will fetch its data on time: {e}")
+            await _sleep_until(due)
+            await self._fire(job, due, prepared)
+            due = job.schedule.next_after(due)
+
+    async def _fire(self, job: Job, due: datetime.datetime, prepared: Any) -> None:
+        """Run the job if it's this replica's turn; the due time counts as handled only after this replica ran it"""
+        key = f"{job.name}:{due.strftime('%Y-%m-%dT%H:%M')}"
+        if await scheduled_run(key):
+            logger.info(f"Running {job.name} due at {due}")
+            succeeded = False
+            renewing = asyncio.create_task(leadership.keep_run(key))
+            try:
+                await job.run(prepared)
+                succeeded = True
+            except Exception as e:
+                logger.exception(f"Scheduled {job.name} failed: {e}")
+            finally:
+                renewing.cancel()
+                await leadership.finish_run(key, succeeded)
+            # only the replica which ran the job: a follower must not hide a run the leader didn't finish
+            schedule_repository.set_last_run(job.name, due)
@@ -0,0 +1,236 @@
+"""
+Outbound Bot API queue: every message the bot sends goes through token buckets, one per chat and one global, so
+that a scheduled fan-out doesn't run into Telegram flood limits and doesn't slow down replies to staff.
+
+Requests wait for the global bucket in priority lanes: interactive replies (private chats) first, then channel posts,
+then bulk fan-out (scheduled reports, marked with `send_lane(Lane.BULK)`). `RetryAfter` answers are waited out and
+retried, the chat (or the whole queue) is paused meanwhile.
+
+With `redis_url` the buckets are kept in Redis, so the limits hold for all replicas and worker processes together.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from enum import IntEnum
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from src.bot import metrics
+from src.bot.logging_ import logger
+
+MAX_RETRIES = 3
+# methods which post or change messages, limits of Telegram apply to them
+LIMITED_PREFIXES = ("send", "forward", "copy", "edit")
+CHAT_BURST = 3
+MAX_IDLE_BUCKETS = 10_000
+BUCKET_PREFIX = "fika:send"
+
+# Lua: refill the bucket by Redis time, then ARGV[3] is "take", "reserve" or "pause" (see TokenBucket),
+# ARGV[4] is the cost or the pause in seconds. Returns the seconds to wait as a string, Lua numbers become integers
+UPDATE_BUCKET = """
+local rate, capacity, op, arg = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+local time = redis.call('time')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('hmget', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+tokens = math.min(capacity, tokens + math.max(0, now - (tonumber(state[2]) or now)) * rate)
+local wait = 0
+if op == 'take' then
+    local need = math.min(arg, capacity)
+    if tokens < need then wait = (need - tokens) / rate else tokens = tokens - arg end
+elseif op == 'reserve' then
+    tokens = tokens - arg
+    wait = math.max(0, -tokens / rate)
+else
+    tokens = math.min(tokens, 1 - arg * rate)
+end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('expire', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return tostring(wait)
+"""
+
+
+class Lane(IntEnum):
+    INTERACTIVE = 0
+    CHANNEL = 1
+    BULK = 2
+
+
+_lane: ContextVar[Lane | None] = ContextVar("send_lane", default=None)
+
+
+@contextlib.contextmanager
+def send_lane(lane: Lane) -> Iterator[None]:
+    """Send requests made inside the block (and in tasks started from it) in `lane`"""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """A bucket in memory of this process"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def take(self, cost: int = 1) -> float:
+        """
+        Take `cost` tokens if they are available (a full bucket is enough for a bigger cost): 0, otherwise seconds
+        until they are, nothing is taken then
+        """
+        self._refill()
+        need = min(cost, self.capacity)
+        if self.tokens < need:
+            return (need - self.tokens) / self.rate
+        self.tokens -= cost
+        return 0.0
+
+    async def reserve(self, cost: int = 1) -> float:
+        """Take tokens, possibly in advance: seconds to wait until they're due. Keeps requests of a chat in order"""
+        self._refill()
+        self.tokens -= cost
+        return max(0.0, -self.tokens / self.rate)
+
+    async def pause(self, seconds: float) -> None:
+        """No tokens for `seconds` (after RetryAfter)"""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def is_idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class RedisTokenBucket:
+    """A bucket shared by processes: the state is a Redis hash which expires once the bucket is full again"""
+
+    def __init__(self, script: AsyncScript, key: str, rate: float, capacity: float):
+        self.script = script
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    async def _update(self, op: str, arg: float) -> float:
+        try:
+            return float(await self.script(keys=[self.key], args=[self.rate, self.capacity, op, arg]))
+        except RedisError as e:  # don't hold sending up while Redis is down
+            logger.warning(f"Couldn't update send rate limit {self.key}: {e}")
+            return 0.0
+
+    async def take(self, cost: int = 1) -> float:
+        return await self._update("take", cost)
+
+    async def reserve(self, cost: int = 1) -> float:
+        return await self._update("reserve", cost)
+
+    async def pause(self, seconds: float) -> None:
+        await self._update("pause", seconds)
+
+
+class SendQueue(BaseRequestMiddleware):
+    """
+    Bot session middleware: rate limits and prioritizes sending requests, retries them after RetryAfter
+    """
+
+    def __init__(self, rate: float, chat_rate: float, group_rate: float, redis: Redis | None = None):
+        self._script = redis.register_script(UPDATE_BUCKET) if redis is not None else None
+        if self._script is None:
+            self.global_bucket = TokenBucket(rate, capacity=max(rate, 1))
+        else:
+            self.global_bucket = RedisTokenBucket(self._script, f"{BUCKET_PREFIX}:global", rate, capacity=max(rate, 1))
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_buckets: dict[int | str, TokenBucket] = {}
+        self._waiting: list[tuple[Lane, int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+    async def __call__(self, make_request, bot, method):
+        api_method = method.__api_method__
+        chat_id = getattr(method, "chat_id", None)
+        limited = api_method.startswith(LIMITED_PREFIXES)
+        # every message of an album counts against the limits
+        cost = len(method.media) if api_method == "sendMediaGroup" else 1
+        for attempt in range(MAX_RETRIES + 1):
+            if limited:
+                await self._acquire(chat_id, cost)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                metrics.telegram_retry_after_total.inc(method=api_method)
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.warning(f"{api_method} to {chat_id}: retry after {e.retry_after} s")
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self.global_bucket
+                await bucket.pause(e.retry_after)
+                if not limited:
+                    await asyncio.sleep(e.retry_after)
+
+    def lane(self, chat_id: int | str | None) -> Lane:
+        lane = _lane.get()
+        if lane is not None:
+            return lane
+        return Lane.INTERACTIVE if isinstance(chat_id, int) and chat_id > 0 else Lane.CHANNEL
+
+    async def _acquire(self, chat_id: int | str | None, cost: int) -> None:
+        lane = self.lane(chat_id)
+        started = time.monotonic()
+        if chat_id is not None:
+            await asyncio.sleep(await self._chat_bucket(chat_id).reserve(cost))
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiting, (lane, next(self._order), cost, future))
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+        self._wakeup.set()
+        await future
+        metrics.send_queue_wait.observe(time.monotonic() - started, lane=lane.name.lower())
+
+    async def _dispatch(self) -> None:
+        """Hand out global tokens to waiting requests, the most urgent lane first"""
+        while True:
+            while self._waiting and self._waiting[0][3].done():  # cancelled while waiting
+                heapq.heappop(self._waiting)
+            if not self._waiting:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            entry = heapq.heappop(self._waiting)
+            if delay := await self.global_bucket.take(entry[2]):
+                heapq.heappush(self._waiting, entry)  # keeps its place, unless a more urgent request came
+                await asyncio.sleep(delay)
+                continue
+            if not entry[3].done():
+                entry[3].set_result(None)
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket | RedisTokenBucket:
+        rate = self.chat_rate if isinstance(chat_id, int) and chat_id > 0 else self.group_rate
+        if self._script is not None:
+            return RedisTokenBucket(self._script, f"{BUCKET_PREFIX}:chat:{chat_id}", rate, capacity=CHAT_BURST)
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_IDLE_BUCKETS:
+                self.chat_buckets = {key: value for key, value in self.chat_buckets.items() if not value.is_idle()}
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, capacity=CHAT_BURST)
+        return bucket
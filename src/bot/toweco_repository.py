@@ -3,22 +3,23 @@ import datetime
 import httpx
 from dateutil import tz
 from src.bot.logging_ import logger
+from src.bot.metrics import dependency_errors_total, track_call
+from src.bot.tracing import span
 from src.config import settings
 
 
 class TowecoRepository:
-    BASE_URL = "https://api-v4.toweco.ru/"
-
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, base_url: str = "https://api-v4.toweco.ru/"):
         self.client = httpx.AsyncClient(headers={"Content-Type": "application/json"})
         self.username = username
         self.password = password
+        self.base_url = base_url
         self.auth_was_called = False
 
     async def auth(self) -> None:
-        url = f"{self.BASE_URL}api/v1/auth/getToken"
+        url = f"{self.base_url}api/v1/auth/getToken"
         payload = {"id": 1, "jsonrpc": "2.0", "params": {"username": self.username, "password": self.password}}
-        response = await self.client.post(url, json=payload)
+        response = await self._post(url, payload)
         response.raise_for_status()
         data = response.json()
         access_token = data["result"]["accessToken"]
@@ -43,7 +44,7 @@ class TowecoRepository:
             params["dateTo"] = date_to.strftime("%d.%m.%Y")
 
         payload = [{"id": 0, "jsonrpc": "2.0", "method": "private.getReviews", "params": params}]
-        result = await self.apply(self.BASE_URL, payload)
+        result = await self.apply(self.base_url, payload)
         reviews = result["reviews"]["reviews"]
         # filter out test reviews
         return [review for review in reviews if review["author"] not in ("Test", "0", "NEW TEST")]
@@ -52,36 +53,51 @@ class TowecoRepository:
         if not self.auth_was_called:
             await self.auth()
 
-        response = await self.client.post(url, json=payload)
+        response = await self._post(url, payload)
         try:
             response.raise_for_status()
         except httpx.HTTPStatusError as e:
             logger.warning(e)
             if e.response.status_code == 401:
                 await self.auth()
-                response = await self.client.post(url, json=payload)
+                response = await self._post(url, payload)
                 response.raise_for_status()
 
         as_python = response.json()[0]
         if "error" in as_python:
             logger.warning(f"Error in response from Toweco API: {as_python}")
+            dependency_errors_total.inc(service="toweco", method=self._method(payload))
             if as_python["error"] == "unauthorized" or as_python["error"] == "unauthorized":
                 await self.auth()
-                response = await self.client.post(url, json=payload)
+                response = await self._post(url, payload)
                 response.raise_for_status()
                 as_python = response.json()[0]
-                logger.info(as_python)
+                logger.debug(as_python)
 
                 if "result" in as_python:
                     return as_python["result"]
             raise RuntimeError(as_python)
         else:
-            logger.info(as_python)
+            logger.debug(as_python)
             return as_python["result"]
 
+    async def _post(self, url: str, payload: Any) -> httpx.Response:
+        method = self._method(payload)
+        with span(f"toweco {method}") as current, track_call("toweco", method):
+            response = await self.client.post(url, json=payload)
+            current.set(status=response.status_code, bytes=len(response.content))
+        if response.is_error:
+            dependency_errors_total.inc(service="toweco", method=method)
+        return response
+
+    def _method(self, payload: Any) -> str:
+        if isinstance(payload, list):
+            return payload[0].get("method", "batch")
+        return payload.get("method", "auth")
+
     async def get_locations(self, places: list[int] | None = None) -> dict:
         payload = [{"id": 0, "jsonrpc": "2.0", "method": "private.getLocations", "params": {"places": places}}]
-        return await self.apply(self.BASE_URL, payload)
+        return await self.apply(self.base_url, payload)
 
     async def close(self) -> None:
         await self.client.aclose()
@@ -128,4 +144,6 @@ class TowecoRepository:
         return f"{stars}\n{provider}, {published_at}\nАвтор: {author}\n{review}".strip()
 
 
-toweco_repository = TowecoRepository(settings.toweco_username, settings.toweco_password.get_secret_value())
+toweco_repository = TowecoRepository(
+    settings.toweco_username, settings.toweco_password.get_secret_value(), settings.toweco_base_url
+)
@@ -0,0 +1,179 @@
+"""
+Lightweight spans for the report pipeline.
+
+A span measures a block of code, nested spans are tracked through a context variable (so they follow asyncio tasks
+and `asyncio.to_thread`). When a root span ends, the whole tree is exported as JSON lines to `tracing_file`
+and/or posted to `tracing_endpoint`.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import functools
+import inspect
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+
+import httpx
+
+from src.bot.logging_ import logger
+from src.bot.metrics import report_stage_duration
+from src.config import settings
+
+
+class Span:
+    def __init__(self, name: str, parent: "Span | None" = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.children: list[Span] = []
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.started_at = datetime.datetime.now(datetime.UTC)
+        self._started = time.perf_counter()
+        self.duration: float | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        self.duration = time.perf_counter() - self._started
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+_export_tasks: set[asyncio.Task] = set()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Measure the block as a child of the current span (or as a new root), attributes may be added with `Span.set`
+    """
+    parent = _current_span.get()
+    current = Span(name, parent, **attributes)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=repr(e))
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        if parent is None:
+            export(current)
+
+
+@contextlib.contextmanager
+def report_stage(report: str, stage: str, **attributes) -> Iterator[Span]:
+    """
+    Span of a report pipeline stage, its duration also goes to `fika_report_stage_duration_seconds`
+    """
+    current = None
+    try:
+        with span(stage, **attributes) as current:
+            yield current
+    finally:
+        if current is not None:
+            report_stage_duration.observe(current.duration, report=report, stage=stage)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator which wraps every call of a function (sync or async) into a span,
+    size of a `bytes` result is recorded as the `bytes` attribute
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name) as current:
+                result = func(*args, **kwargs)
+                if isinstance(result, bytes):
+                    current.set(bytes=len(result))
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def format_breakdown(root: Span) -> str:
+    """
+    One line with durations of the direct children of `root`, spans with the same name are summed up
+    """
+    stages: dict[str, list[float]] = {}
+    for child in root.children:
+        stages.setdefault(child.name, []).append(child.duration or 0)
+    parts = [
+        f"{name}{f' ×{len(durations)}' if len(durations) > 1 else ''} {sum(durations):.1f} с"
+        for name, durations in stages.items()
+    ]
+    return f"⏱ {root.name} {root.duration or 0:.1f} с: " + " · ".join(parts)
+
+
+def export(root: Span) -> None:
+    if not settings.tracing_file and not settings.tracing_endpoint:
+        return
+    records = [span_.as_dict() for span_ in root.walk()]
+    if settings.tracing_file:
+        try:
+            with open(settings.tracing_file, "a") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        except OSError as e:
+            logger.warning(f"Couldn't write spans to {settings.tracing_file}: {e}")
+    if settings.tracing_endpoint:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # root span in a worker thread
+            _post_spans_sync(records)
+        else:
+            task = loop.create_task(_post_spans(records))
+            _export_tasks.add(task)
+            task.add_done_callback(_export_tasks.discard)
+
+
+async def _post_spans(records: list[dict]) -> None:
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.post(settings.tracing_endpoint, content=json.dumps(records, default=str))
+            response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning(f"Couldn't export spans: {e}")
+
+
+def _post_spans_sync(records: list[dict]) -> None:
+    try:
+        httpx.post(settings.tracing_endpoint, content=json.dumps(records, default=str), timeout=10).raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning(f"Couldn't export spans: {e}")
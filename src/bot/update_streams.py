@@ -0,0 +1,178 @@
+"""
+Horizontally scaled update processing through Redis Streams.
+
+The receiving process (polling or webhook) doesn't handle updates: `StreamProducerMiddleware` appends every raw update
+to one of `update_streams` streams chosen by chat, so updates of a chat keep their order. Worker processes
+(`python -m src.bot worker`) share the streams: a stream is owned by one worker at a time through a lease key, its
+messages are handled one by one and acknowledged in the consumer group. When a worker dies, its leases expire, another
+worker takes the streams over and first claims the messages left unacknowledged (XAUTOCLAIM) once they've been idle
+for `LEASE_TTL`, so they are handled again instead of being lost, but not while their owner may still handle them.
+"""
+
+import asyncio
+import contextlib
+import json
+import math
+import os
+import socket
+import time
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from src.bot.leader import RELEASE_LEASE, RENEW_LEASE
+from src.bot.logging_ import logger
+
+STREAM_PREFIX = "fika:updates"
+GROUP = "workers"
+WORKERS_KEY = f"{STREAM_PREFIX}:workers"
+LEASE_TTL = 15.0
+HEARTBEAT_INTERVAL = 5.0
+READ_BLOCK_MS = 1000
+
+
+def stream_key(shard: int) -> str:
+    return f"{STREAM_PREFIX}:{shard}"
+
+
+def lease_key(shard: int) -> str:
+    return f"{stream_key(shard)}:lease"
+
+
+class StreamProducerMiddleware(BaseMiddleware):
+    """
+    Outer middleware for `dp.update` of the receiving process: pushes the update to the stream of its chat
+    instead of handling it
+    """
+
+    def __init__(self, redis: Redis, shards: int, maxlen: int):
+        self.redis = redis
+        self.shards = shards
+        self.maxlen = maxlen
+        # updates are handled as concurrent tasks: appends to a stream go one at a time, in the order of arrival
+        self._locks = [asyncio.Lock() for _ in range(shards)]
+
+    async def __call__(self, handler, event: Update, data):
+        chat, user = data.get("event_chat"), data.get("event_from_user")
+        shard = (chat.id if chat else user.id if user else 0) % self.shards
+        async with self._locks[shard]:
+            await self.redis.xadd(
+                stream_key(shard),
+                {"update": event.model_dump_json(exclude_unset=True)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        # not UNHANDLED: CustomDispatcher must not answer that it doesn't understand
+        return None
+
+
+class UpdateWorker:
+    def __init__(self, dp: Dispatcher, bot: Bot, redis: Redis, shards: int):
+        self.dp = dp
+        self.bot = bot
+        self.redis = redis
+        self.shards = shards
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self.owned: dict[int, asyncio.Task] = {}
+        self._renew = redis.register_script(RENEW_LEASE)
+        self._release = redis.register_script(RELEASE_LEASE)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Take a fair share of streams and handle their updates until `stop` is set"""
+        await self._create_groups()
+        logger.info(f"Worker {self.name} started, {self.shards} update streams")
+        try:
+            while not stop.is_set():
+                await self._heartbeat()
+                await self._rebalance()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), HEARTBEAT_INTERVAL)
+        finally:
+            await asyncio.gather(*(self._give_up(shard) for shard in list(self.owned)))
+            await self.redis.zrem(WORKERS_KEY, self.name)
+            logger.info(f"Worker {self.name} stopped")
+
+    async def _create_groups(self) -> None:
+        for shard in range(self.shards):
+            try:
+                await self.redis.xgroup_create(stream_key(shard), GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):  # the group exists already
+                    raise
+
+    async def _heartbeat(self) -> None:
+        now = time.time()
+        await self.redis.zadd(WORKERS_KEY, {self.name: now})
+        await self.redis.zremrangebyscore(WORKERS_KEY, 0, now - LEASE_TTL)
+        for shard in list(self.owned):
+            if self.owned[shard].done():  # e.g. Redis connection errors: start over
+                logger.error(f"Consumer of update stream {shard} failed: {self.owned[shard].exception()!r}")
+                await self._give_up(shard)
+            elif not await self._renew(keys=[lease_key(shard)], args=[self.name, int(LEASE_TTL * 1000)]):
+                logger.warning(f"Lost the lease of update stream {shard}")
+                await asyncio.gather(self.owned.pop(shard), return_exceptions=True)
+
+    async def _rebalance(self) -> None:
+        workers = await self.redis.zcard(WORKERS_KEY)
+        fair_share = math.ceil(self.shards / max(workers, 1))
+        while len(self.owned) > fair_share:  # let newly started workers take some streams
+            await self._give_up(max(self.owned))
+        for shard in range(self.shards):
+            if len(self.owned) >= fair_share:
+                break
+            if shard in self.owned:
+                continue
+            if await self.redis.set(lease_key(shard), self.name, nx=True, px=int(LEASE_TTL * 1000)):
+                logger.info(f"Took over update stream {shard}")
+                self.owned[shard] = asyncio.create_task(self._consume(shard))
+
+    async def _give_up(self, shard: int) -> None:
+        """Stop consuming the stream after the current update, then release its lease"""
+        task = self.owned.pop(shard, None)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+        await self._release(keys=[lease_key(shard)], args=[self.name])
+
+    async def _consume(self, shard: int) -> None:
+        stream = stream_key(shard)
+        task = asyncio.current_task()
+        # messages left unacknowledged by the previous owner become ours once they're abandoned: it may be alive and
+        # still handling one after losing the lease (e.g. a long render blocked its loop), new messages wait for it
+        while self.owned.get(shard) is task:
+            start = "0-0"
+            while True:
+                start, _, *_ = await self.redis.xautoclaim(
+                    stream, GROUP, self.name, min_idle_time=int(LEASE_TTL * 1000), start_id=start
+                )
+                if start in ("0-0", b"0-0"):
+                    break
+            pending = await self.redis.xpending(stream, GROUP)
+            if not any(consumer["name"].decode() != self.name for consumer in pending["consumers"]):
+                break
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+        last_id = "0"  # own pending messages first, then new ones
+        while self.owned.get(shard) is task:
+            block = None if last_id == "0" else READ_BLOCK_MS
+            response = await self.redis.xreadgroup(GROUP, self.name, {stream: last_id}, count=10, block=block)
+            messages = response[0][1] if response else []
+            if not messages and last_id == "0":
+                last_id = ">"
+            for message_id, fields in messages:
+                await self._handle(stream, message_id, fields)
+                if self.owned.get(shard) is not task:
+                    break  # the rest stays pending for the next owner
+
+    async def _handle(self, stream: str, message_id, fields: dict | None) -> None:
+        raw = fields.get(b"update") if fields else None  # None: trimmed from the stream
+        if raw is not None:
+            try:
+                result = await self.dp.feed_raw_update(self.bot, json.loads(raw))
+                if isinstance(result, TelegramMethod):
+                    await self.dp.silent_call_request(self.bot, result)
+            except Exception as e:  # like polling, a failed update is not retried
+                logger.exception(f"Failed to handle update {message_id} from {stream}: {e}")
+        await self.redis.xack(stream, GROUP, message_id)
@@ -1,8 +1,24 @@
 import datetime
 import json
+import zlib
+from collections.abc import Iterator
 
+from src.bot.analytics_repository import analytics_repository
 from src.bot.db import conn, cur
 from src.bot.logging_ import logger
+from src.config import settings
+
+REPORT_PROVIDER = "Отчёт от сотрудника"
+
+# Fields of aiogram `Message` which are used by the bot, for `Message.model_dump(include=...)`
+REPORT_MESSAGE_FIELDS = {
+    "message_id": True,
+    "date": True,
+    "from_user": {"id", "first_name", "last_name", "username"},
+    "text": True,
+    "caption": True,
+    "voice": {"file_id", "duration"},
+}
 
 
 class WaiterRepository:
@@ -48,44 +64,144 @@ class WaiterRepository:
         cur.execute("UPDATE waiters SET deleted = true WHERE telegram_id = ?", (telegram_id,))
         conn.commit()
 
-    def add_report(self, waiter_id: int, message: str) -> None:
+    def add_report(self, waiter_id: int, message: dict, commit: bool = True) -> int:
+        """
+        Store a report, return its id. With `commit=False` the caller commits it, e.g. together with an outbox entry
+        """
         date = datetime.datetime.now(datetime.UTC)
+        review, author = self.project_message(message)
+        cur.execute("SELECT role FROM waiters WHERE telegram_id = ?", (waiter_id,))
+        role = row[0] if (row := cur.fetchone()) else None
         cur.execute(
-            "INSERT INTO waiter_reports (waiter_id, date, message) VALUES (?, ?, ?)",
-            (waiter_id, date, message),
+            "INSERT INTO waiter_reports"
+            " (waiter_id, date, message, review, author, provider, role, pending_voice_file_id)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                waiter_id,
+                date,
+                self._encode_message(message),
+                review,
+                author,
+                REPORT_PROVIDER,
+                role,
+                self._pending_voice_file_id(message),
+            ),
         )
-        conn.commit()
-
-    def update_report(self, report_id: int, message: str) -> None:
+        report_id = cur.lastrowid
+        analytics_repository.record_report(date, role)
+        if commit:
+            conn.commit()
+        return report_id
+
+    def update_report(self, report_id: int, message: dict) -> None:
+        review, author = self.project_message(message)
         cur.execute(
-            "UPDATE waiter_reports SET message = ? WHERE report_id = ?",
-            (message, report_id),
+            "UPDATE waiter_reports SET message = ?, review = ?, author = ?, pending_voice_file_id = ?"
+            " WHERE report_id = ?",
+            (self._encode_message(message), review, author, self._pending_voice_file_id(message), report_id),
         )
         conn.commit()
 
-    def get_reports(self, date_from: datetime.date) -> list[tuple]:
+    def get_report_message(self, report_id: int) -> dict | None:
+        cur.execute("SELECT message FROM waiter_reports WHERE report_id = ?", (report_id,))
+        row = cur.fetchone()
+        return self._decode_message(row[0]) if row else None
+
+    def get_reports(self, date_from: datetime.date) -> list[dict]:
+        """
+        Staff reports in the review format (see `to_toweco_format`), read from the projection columns
+        """
         cur.execute(
-            "SELECT * FROM waiter_reports WHERE DATE(date) >= ?",
+            "SELECT review, provider, author, date, role FROM waiter_reports WHERE date >= ? ORDER BY date",
             (date_from,),
         )
-        return cur.fetchall()
+        return [
+            {"review": review, "provider": provider, "author": author, "publishedAt": date, "role": role}
+            for review, provider, author, date, role in cur.fetchall()
+        ]
+
+    def iter_reports(self, date_from: datetime.date, batch_size: int = 500) -> Iterator[dict]:
+        """
+        Same as `get_reports`, but reads rows in batches through a separate cursor
+        """
+        reports_cur = conn.cursor()
+        try:
+            reports_cur.execute(
+                "SELECT review, provider, author, date, role FROM waiter_reports WHERE date >= ? ORDER BY date",
+                (date_from,),
+            )
+            while rows := reports_cur.fetchmany(batch_size):
+                for review, provider, author, date, role in rows:
+                    yield {"review": review, "provider": provider, "author": author, "publishedAt": date, "role": role}
+        finally:
+            reports_cur.close()
 
-    def get_not_yet_transcripted(self) -> list[tuple]:
+    def get_not_yet_transcripted(self) -> list[tuple[int, int, str, dict]]:
         cur.execute(
-            "SELECT * FROM waiter_reports WHERE json_extract(message, '$.voice') IS NOT NULL AND json_extract(message, '$.transcription') IS NULL"
+            "SELECT report_id, waiter_id, date, message FROM waiter_reports WHERE pending_voice_file_id IS NOT NULL"
+            # reports in the outbox are transcribed by the feedback relay
+            " AND report_id NOT IN (SELECT report_id FROM feedback_outbox)"
         )
-        return cur.fetchall()
+        return [
+            (report_id, waiter_id, date, self._decode_message(message))
+            for report_id, waiter_id, date, message in cur.fetchall()
+        ]
+
+    def count_not_yet_transcripted(self) -> int:
+        cur.execute("SELECT COUNT(*) FROM waiter_reports WHERE pending_voice_file_id IS NOT NULL")
+        return cur.fetchone()[0]
+
+    def archive_reports(self, months: int) -> int:
+        """
+        Move reports older than `months` full months to the monthly tables of the archive database
+        """
+        # report dates are stored in UTC, months are split by them too
+        today = datetime.datetime.now(datetime.UTC).date()
+        month_index = today.year * 12 + today.month - 1 - months
+        cutoff = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+        cur.execute("SELECT name, type FROM pragma_table_info('waiter_reports', 'main')")
+        columns = cur.fetchall()
+        column_list = ", ".join(name for name, _ in columns)
+
+        cur.execute("SELECT DISTINCT strftime('%Y_%m', date) FROM waiter_reports WHERE date < ?", (cutoff,))
+        archived = 0
+        for (month,) in cur.fetchall():
+            name = f"waiter_reports_{month}"
+            cur.execute(f"CREATE TABLE IF NOT EXISTS archive.{name} AS SELECT * FROM main.waiter_reports WHERE 0")
+            # columns added to waiter_reports after the archive table was created
+            cur.execute("SELECT name FROM pragma_table_info(?, 'archive')", (name,))
+            archived_columns = {column for (column,) in cur.fetchall()}
+            for column, type_ in columns:
+                if column not in archived_columns:
+                    cur.execute(f"ALTER TABLE archive.{name} ADD COLUMN {column} {type_}")
+            cur.execute(
+                f"INSERT INTO archive.{name} ({column_list}) SELECT {column_list} FROM main.waiter_reports"
+                " WHERE strftime('%Y_%m', date) = ? AND date < ?",
+                (month, cutoff),
+            )
+            cur.execute(
+                "DELETE FROM main.waiter_reports WHERE strftime('%Y_%m', date) = ? AND date < ?", (month, cutoff)
+            )
+            archived += cur.rowcount
+        conn.commit()
 
-    def to_toweco_format(self, report: tuple) -> dict:
-        report_id, waiter_id, date, message = report
-        message_object = json.loads(message)
+        if archived:
+            cur.execute("PRAGMA main.incremental_vacuum").fetchall()
+        return archived
 
+    def project_message(self, message_object: dict) -> tuple[str, str]:
+        """
+        Review text and author of the stored aiogram message
+        """
         if "text" in message_object:
             review_text = message_object["text"]
         elif "caption" in message_object:
             review_text = message_object["caption"]
         elif "transcription" in message_object:
             review_text = f"Транскрипция: {message_object['transcription']}"
+        elif "voice" in message_object:
+            review_text = "Нет текста"  # ждёт транскрипции
         else:
             logger.warning(f"Bad message object: {message_object}")
             review_text = "Нет текста"
@@ -100,13 +216,34 @@ class WaiterRepository:
                 ),
             )
         )
+        return review_text, author
+
+    def to_toweco_format(self, report: tuple) -> dict:
+        report_id, waiter_id, date, message = report[:4]
+        review_text, author = self.project_message(self._decode_message(message))
 
         return {
             "review": review_text,
-            "provider": "Отчёт от сотрудника",
+            "provider": REPORT_PROVIDER,
             "author": author,
             "publishedAt": date,
         }
 
+    def _encode_message(self, message: dict) -> str | bytes:
+        as_json = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        if settings.report_compression:
+            return zlib.compress(as_json.encode(), 9)
+        return as_json
+
+    def _decode_message(self, stored: str | bytes) -> dict:
+        if isinstance(stored, bytes):
+            stored = zlib.decompress(stored)
+        return json.loads(stored)
+
+    def _pending_voice_file_id(self, message: dict) -> str | None:
+        if "voice" in message and "transcription" not in message:
+            return message["voice"]["file_id"]
+        return None
+
 
 waiter_repository: WaiterRepository = WaiterRepository()
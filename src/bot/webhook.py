@@ -0,0 +1,66 @@
+"""
+Webhook ingestion: Telegram posts updates to an embedded aiohttp server instead of being long-polled
+"""
+
+import asyncio
+import signal
+from urllib.parse import urlsplit
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from src.bot.logging_ import logger
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """
+    Answers Telegram right away and handles updates in background, at most `limit` of them at the same time
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, limit: int, secret_token: str | None = None):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token)
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def _background_feed_update(self, bot: Bot, update: dict) -> None:
+        async with self._semaphore:
+            await super()._background_feed_update(bot, update)
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    url: str,
+    host: str,
+    port: int,
+    secret_token: str | None,
+    limit: int,
+    drop_pending_updates: bool,
+) -> None:
+    """
+    Serve the webhook until SIGINT/SIGTERM. The server is started before `setWebhook`, so updates which
+    piled up while the bot was down are delivered to a ready server.
+    """
+    path = urlsplit(url).path or "/"
+    app = web.Application()
+    LimitedRequestHandler(dp, bot, limit=limit, secret_token=secret_token).register(app, path=path)
+    setup_application(app, dp, bot=bot)  # dp.startup and dp.shutdown follow the server lifecycle
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        await bot.set_webhook(
+            url,
+            secret_token=secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=drop_pending_updates,
+        )
+        logger.info(f"Receiving updates at {url} (listening on {host}:{port}{path})")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_ in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_, stop.set)
+        await stop.wait()
+    finally:
+        await runner.cleanup()
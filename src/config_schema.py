@@ -16,6 +16,43 @@ class SettingBaseModel(BaseModel):
     model_config = ConfigDict(use_attribute_docstrings=True, extra="forbid")
 
 
+class ImageFormat(StrEnum):
+    PNG = "png"
+    "Full-colour PNG"
+    PNG_PALETTE = "png-palette"
+    "PNG quantised to a palette of `colors` colours"
+    WEBP = "webp"
+    "Lossy WebP with `quality`"
+    JPEG = "jpeg"
+    "JPEG with `quality`"
+
+    @property
+    def extension(self) -> str:
+        return {"png-palette": "png", "jpeg": "jpg"}.get(self.value, self.value)
+
+
+class RelayMode(StrEnum):
+    FORWARD = "forward"
+    "Role header, forwarded message, then the transcription reply or a separator: 3 calls per feedback"
+    COPY = "copy"
+    "One message: a copy of the media with the header and transcription in the caption, or a composed text"
+
+
+class ImageProfile(SettingBaseModel):
+    """
+    Output profile for rendered images (charts, mood meter).
+    """
+
+    format: ImageFormat = ImageFormat.PNG
+    "Image format"
+    dpi: int = Field(200, ge=30, le=600)
+    "Resolution in dots per inch"
+    quality: int = Field(85, ge=1, le=100)
+    "Quality for webp and jpeg"
+    colors: int = Field(64, ge=2, le=256)
+    "Palette size for png-palette"
+
+
 class Settings(SettingBaseModel):
     """
     Settings for the application.
@@ -26,6 +63,31 @@ class Settings(SettingBaseModel):
     "App environment flag"
     redis_url: SecretStr | None = Field(None, examples=["redis://localhost:6379/0", "redis://redis:6379/0"])
     "Redis URL"
+    webhook_url: str | None = Field(None, examples=["https://bot.example.com/telegram"])
+    "Public HTTPS URL for Telegram to post updates to (webhook mode); long polling is used if not set"
+    webhook_secret: SecretStr | None = None
+    "Secret token Telegram sends in the X-Telegram-Bot-Api-Secret-Token header of every webhook request"
+    webhook_host: str = "0.0.0.0"
+    "Interface of the webhook server"
+    webhook_port: int = 8080
+    "Port of the webhook server, it serves the path of `webhook_url`"
+    handler_concurrency: int = Field(100, ge=1)
+    "Maximum number of updates handled at the same time (polling and webhook)"
+    drop_pending_updates: bool = False
+    "Drop updates received while the bot was down instead of handling them on start"
+    send_rate_limit: float = Field(30, ge=0)
+    "Messages per second the bot sends in total (Telegram allows about 30), 0 disables the send queue"
+    chat_send_rate_limit: float = Field(1, gt=0)
+    "Messages per second the bot sends to one private chat, short bursts of 3 are allowed"
+    group_send_rate_limit: float = Field(round(20 / 60, 3), gt=0)
+    "Messages per second the bot sends to one group or channel (Telegram allows 20 per minute)"
+    update_streams: int = Field(0, ge=0)
+    """
+    Number of Redis streams (by chat) to pass updates to `python -m src.bot worker` processes, requires `redis_url`.
+    If set, the main process only receives updates; not set — updates are handled by the main process.
+    """
+    update_stream_maxlen: int = 100_000
+    "Approximate limit of messages kept in every update stream"
     bot_token: SecretStr
     "Telegram bot token from @BotFather"
     bot_name: str = None
@@ -46,14 +108,50 @@ class Settings(SettingBaseModel):
     "Toweco username"
     toweco_password: SecretStr
     "Toweco password"
+    toweco_base_url: str = "https://api-v4.toweco.ru/"
+    "Toweco API URL (ending with a slash), may point to a local fake (scripts/fake_services.py)"
     openai_api_key: SecretStr
     "OpenAI API key"
     openai_chat_model: str = "gpt-4o"
     "OpenAI chat model"
+    openai_base_url: str | None = None
+    "OpenAI API URL, may point to a local fake (scripts/fake_services.py); the official API if not set"
+    openai_proxy_url: SecretStr | None = None
+    "Proxy for OpenAI requests, the built-in proxy is used if not set; set an empty string to connect directly"
     daily_report_time: datetime.time | None = None
     "Time for daily report (UTC)"
+    feedback_relay_mode: RelayMode = RelayMode.COPY
+    "How staff feedback is posted to the channel; `copy` falls back to `forward` if the caption is too long"
+    summary_report_schedule: str = "0 10 15,L * *"
+    "When to send PDF summary (Asia/Almaty time): minute hour day month weekday, `L` is the last day of month"
+    report_prepare_minutes: int = Field(10, ge=0)
+    "Fetch reviews and AI output for a scheduled report this many minutes ahead, so that it's delivered on time"
+    report_catch_up_hours: float = Field(6, ge=0)
+    "Send a scheduled report missed while the bot was down on start if it's at most this many hours late"
     secret_for_waiter: SecretStr
     "Secret key for waiter on /start command"
+    report_compression: bool = False
+    "Compress stored staff reports with zlib"
+    chart_image: ImageProfile = ImageProfile()
+    "Output profile for report charts"
+    mood_meter_image: ImageProfile = ImageProfile(dpi=150)
+    "Output profile for the mood meter embedded into PDF summary"
+    summary_appendix: bool = False
+    "Append every review and staff report of the period to PDF summary"
+    warm_up_renderers: bool = False
+    "Render throwaway charts and PDF in background after startup, so that the first report runs at full speed"
+    metrics_port: int | None = None
+    "Serve Prometheus metrics at http://<metrics_host>:<metrics_port>/metrics (disabled if not set)"
+    metrics_host: str = "0.0.0.0"
+    "Interface for the metrics endpoint"
+    tracing_file: str | None = None
+    "Append spans of the report pipeline to this file as JSON lines"
+    tracing_endpoint: str | None = None
+    "POST spans of the report pipeline as a JSON array to this URL"
+    report_timings: bool = False
+    "Send a one-line timing breakdown of each scheduled report to admins"
+    report_retention_months: int | None = Field(None, ge=1)
+    "Move staff reports older than this number of months to the archive database (keep forever if not set)"
 
     @classmethod
     def from_yaml(cls, path: Path) -> "Settings":